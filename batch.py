@@ -0,0 +1,178 @@
+"""
+Parallel multi-maze batch pipeline.
+
+This module runs the full pipeline (generate a maze, build its feasibility,
+train a Q-learning agent and walk the learned policy) for many independent
+mazes, fanned out over a process pool. Every maze is generated and trained from
+its own random streams, derived from the root seed of the batch and the maze's
+index, so a batch is reproducible no matter how the tasks are scheduled across
+workers. Results are collected into columnar NumPy arrays and written to
+a compressed ``.npz`` file.
+
+Usage:
+    python3 batch.py --sizes 10x10 20x20 --count 100 --seed 0 --output results.npz
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from convert import Feasibility
+from learn import Agent
+from maze import Maze
+from seeding import derive_seed, spawn_generators
+
+# Columns of a batch result, in output order, with their data types
+RESULT_COLUMNS = {
+    "index": np.int64,
+    "nx": np.int32,
+    "ny": np.int32,
+    "success": np.bool_,
+    "path_length": np.int64,
+    "shortest_length": np.int64,
+    "epochs": np.int64,
+    "train_time": np.float64,
+}
+
+
+def make_tasks(sizes, count, seed=0, gamma=0.8, lrn_rate=0.9, epochs=1000, algorithm="backtracker"):
+    """
+    Expand a batch specification into one task per maze.
+
+    Args:
+        sizes (list): Maze sizes as (nx, ny) pairs.
+        count (int): Number of mazes per size.
+        seed (int): Root seed of the batch (default: 0).
+        gamma (float): Discount factor of the agents (default: 0.8).
+        lrn_rate (float): Learning rate of the agents (default: 0.9).
+        epochs (int): Maximum number of training epochs per agent (default: 1000).
+        algorithm (str): Name of the maze generation algorithm (default: "backtracker").
+
+    Returns:
+        list: Task tuples accepted by ``run_pipeline``.
+    """
+    tasks = []
+    for nx, ny in sizes:
+        for _ in range(count):
+            tasks.append((seed, len(tasks), nx, ny, gamma, lrn_rate, epochs, algorithm))
+    return tasks
+
+
+def run_pipeline(task):
+    """
+    Run the full pipeline for a single maze.
+
+    The maze and the training draw from two independent generators derived from
+    the root seed and the index of the task, so the maze, the Q table and
+    therefore the path depend only on the task.
+
+    Args:
+        task (tuple): Task tuple created by ``make_tasks``.
+
+    Returns:
+        tuple: The result columns (see ``RESULT_COLUMNS``) and the path as an
+        ``int64`` array of states.
+    """
+    seed, index, nx, ny, gamma, lrn_rate, epochs, algorithm = task
+    maze_rng, train_rng = spawn_generators(derive_seed(seed, index), 2)
+
+    maze = Maze(nx, ny, [0, 0], algorithm, maze_rng)
+    feasibility = Feasibility(maze, dense=False)
+    agent = Agent(feasibility, gamma=gamma, lrn_rate=lrn_rate, maze=maze, start_x=0, start_y=0)
+    started = time.perf_counter()
+    epochs_run = agent.train(epochs=epochs, rng=train_rng)
+    train_time = time.perf_counter() - started
+
+    path, success, _ = agent.walk(maze, feasibility)
+    path_length = len(path) - 1 if success else -1
+
+    row = (index, nx, ny, success, path_length, maze.end_distance, epochs_run, train_time)
+    return row, path
+
+
+def run_batch(tasks, output=None, workers=None, chunksize=8):
+    """
+    Run the pipeline for every task on a process pool.
+
+    Tasks are handed to the workers in chunks of ``chunksize`` to amortize the
+    inter-process overhead. Results keep the order of ``tasks``. Paths are
+    stored in CSR form: the path of maze ``i`` is
+    ``paths[path_offsets[i]:path_offsets[i + 1]]``.
+
+    Args:
+        tasks (list): Task tuples created by ``make_tasks``.
+        output (str): Path of the ``.npz`` file to write, or None to skip writing.
+        workers (int): Number of worker processes (default: one per CPU).
+        chunksize (int): Number of tasks handed to a worker at a time (default: 8).
+
+    Returns:
+        dict: Mapping of column name to a NumPy array, including ``paths`` and
+        ``path_offsets``.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run_pipeline, tasks, chunksize=chunksize))
+
+    columns = {name: np.array([row[i] for row, _ in results], dtype=dtype)
+               for i, (name, dtype) in enumerate(RESULT_COLUMNS.items())}
+    lengths = [len(path) for _, path in results]
+    columns["path_offsets"] = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    columns["paths"] = (np.concatenate([path for _, path in results]) if results
+                        else np.empty(0, dtype=np.int64))
+
+    if output is not None:
+        np.savez_compressed(output, **columns)
+    return columns
+
+
+def parse_size(text):
+    """
+    Parse a maze size written as ``<nx>x<ny>``.
+
+    Args:
+        text (str): The size, e.g. "10x20".
+
+    Returns:
+        tuple: The width and height.
+    """
+    try:
+        nx, ny = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid maze size '{text}', expected <nx>x<ny>")
+    if nx <= 0 or ny <= 0:
+        raise argparse.ArgumentTypeError("Maze dimensions cannot be 0.")
+    return nx, ny
+
+
+def main():
+    """Run a batch described on the command line and print a summary."""
+    parser = argparse.ArgumentParser(description="Run the maze pipeline for many mazes in parallel.")
+    parser.add_argument("--sizes", type=parse_size, nargs="+", default=[(10, 10)],
+                        help="maze sizes as <nx>x<ny> (default: 10x10)")
+    parser.add_argument("--count", type=int, default=10, help="number of mazes per size")
+    parser.add_argument("--seed", type=int, default=0, help="root seed of the batch")
+    parser.add_argument("--gamma", type=float, default=0.8, help="discount factor")
+    parser.add_argument("--lrn-rate", type=float, default=0.9, help="learning rate")
+    parser.add_argument("--epochs", type=int, default=1000, help="maximum training epochs")
+    parser.add_argument("--algorithm", default="backtracker", help="maze generation algorithm")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=8, help="tasks handed to a worker at a time")
+    parser.add_argument("--output", default="batch_results.npz", help="columnar output file")
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.sizes, args.count, args.seed, args.gamma, args.lrn_rate,
+                       args.epochs, args.algorithm)
+    started = time.perf_counter()
+    columns = run_batch(tasks, args.output, args.workers, args.chunksize)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(tasks)} mazes in {elapsed:.2f}s ({len(tasks) / elapsed:.1f} mazes/s, "
+          f"{args.workers or os.cpu_count()} workers)")
+    print(f"Success rate: {columns['success'].mean():.1%}")
+    print(f"Results saved as '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+Benchmark harness for every stage of the maze pipeline.
+
+This module times maze generation, feasibility construction, Q-learning
+training, walking a policy, drawing and movie making across a range of maze
+sizes, so that the scaling of every stage (and cliffs such as the O(N^2) dense
+feasibility matrix) can be seen. Every measurement runs in a fresh worker
+process and records the best wall time over a few repeats, the peak resident
+set size of the process and the peak of the memory traced by ``tracemalloc``.
+Results are stored as JSON and can be compared against a saved baseline to
+catch regressions.
+
+Usage:
+    python3 benchmark.py --sizes 5 10 20 40 --output benchmark.json
+    python3 benchmark.py --output new.json --baseline benchmark.json --threshold 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from convert import Feasibility
+from draw import draw_maze, make_movie
+from learn import Agent
+from maze import Maze
+from plan import Planner
+
+# Registered benchmark stages, by name, with the largest number of cells they run on
+STAGES = {}
+
+# Side lengths of the square mazes benchmarked by default
+DEFAULT_SIZES = (5, 10, 20, 40, 80, 160, 320, 640, 1280)
+
+# Metrics compared against a baseline
+COMPARED_METRICS = ("seconds", "tracemalloc_peak_mb")
+
+
+def register_stage(name, max_cells=None):
+    """
+    Register a benchmark stage under the given name.
+
+    A stage is called as ``stage(nx, ny, rng)`` and does the setup it needs (for
+    example generating a maze), which is not timed. It returns a function that
+    runs the measured work once and returns a dict of extra results, such as the
+    number of steps taken; ``steps`` and ``epochs`` are turned into per-step and
+    per-epoch costs.
+
+    Args:
+        name (str): Name used to select the stage.
+        max_cells (int): Largest maze (in cells) the stage is run on, or None for
+            no limit other than the time limit (default: None).
+
+    Returns:
+        callable: Decorator registering the stage function.
+    """
+    def decorator(function):
+        STAGES[name] = (function, max_cells)
+        return function
+    return decorator
+
+
+@register_stage("maze")
+def maze_stage(nx, ny, rng):
+    """Generate a maze with the default algorithm."""
+    def run():
+        Maze(nx, ny, [0, 0], rng=rng)
+        return {}
+    return run
+
+
+@register_stage("feasibility_dense", max_cells=4096)
+def feasibility_dense_stage(nx, ny, rng):
+    """Build the feasibility with its dense N x N matrix."""
+    maze = Maze(nx, ny, [0, 0], rng=rng)
+
+    def run():
+        Feasibility(maze, dense=True)
+        return {}
+    return run
+
+
+@register_stage("feasibility_sparse")
+def feasibility_sparse_stage(nx, ny, rng):
+    """Build the sparse neighbour table and its successor index."""
+    maze = Maze(nx, ny, [0, 0], rng=rng)
+
+    def run():
+        Feasibility(maze, dense=False).neighbor_index
+        return {}
+    return run
+
+
+@register_stage("train")
+def train_stage(nx, ny, rng):
+    """Train an agent for a fixed number of epochs, without early stopping."""
+    maze = Maze(nx, ny, [0, 0], rng=rng)
+    feasibility = Feasibility(maze, dense=False)
+    seed = int(rng.integers(2 ** 32))
+
+    def run():
+        agent = Agent(feasibility, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=0, start_y=0)
+        agent.train(epochs=20, tol=None, rng=seed)
+        return {"epochs": agent.epochs_trained, "steps": agent.steps_trained}
+    return run
+
+
+@register_stage("train_batched")
+def train_batched_stage(nx, ny, rng):
+    """Train an agent with 64 walkers in lockstep for a fixed number of epochs."""
+    maze = Maze(nx, ny, [0, 0], rng=rng)
+    feasibility = Feasibility(maze, dense=False)
+    seed = int(rng.integers(2 ** 32))
+
+    def run():
+        agent = Agent(feasibility, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=0, start_y=0)
+        agent.train_batched(epochs=200, n_walkers=64, rng=seed)
+        return {"epochs": 200}
+    return run
+
+
+@register_stage("walk")
+def walk_stage(nx, ny, rng):
+    """Walk the shortest path with Agent.walk."""
+    maze = Maze(nx, ny, [0, 0], rng=rng)
+    feasibility = Feasibility(maze, dense=False)
+    planner = Planner(feasibility, gamma=0.8, maze=maze, start_x=maze.start[0], start_y=maze.start[1])
+    planner.q_from_distances()
+
+    def run():
+        planner.path = []
+        return {"steps": len(planner.walk(maze, feasibility).path) - 1}
+    return run
+
+
+@register_stage("draw_maze", max_cells=40000)
+def draw_maze_stage(nx, ny, rng):
+    """Draw the maze to a PNG file with the PIL backend."""
+    maze = Maze(nx, ny, [0, 0], rng=rng)
+
+    def run():
+        with tempfile.TemporaryDirectory() as directory:
+            draw_maze(maze, os.path.join(directory, "maze.png"))
+        return {}
+    return run
+
+
+@register_stage("draw_maze_numpy")
+def draw_maze_numpy_stage(nx, ny, rng):
+    """Draw the maze to a PNG file with the NumPy backend at one pixel per cell."""
+    maze = Maze(nx, ny, [0, 0], rng=rng)
+
+    def run():
+        with tempfile.TemporaryDirectory() as directory:
+            draw_maze(maze, os.path.join(directory, "maze.png"), backend="numpy", side=1)
+        return {}
+    return run
+
+
+@register_stage("make_movie", max_cells=10000)
+def make_movie_stage(nx, ny, rng):
+    """Make the GIF of the agent following the shortest path."""
+    maze = Maze(nx, ny, [0, 0], rng=rng)
+    feasibility = Feasibility(maze, dense=False)
+    planner = Planner(feasibility, gamma=0.8, maze=maze, start_x=maze.start[0], start_y=maze.start[1])
+    planner.q_from_distances()
+
+    def run():
+        with tempfile.TemporaryDirectory() as directory:
+            make_movie(maze, feasibility, planner.path, os.path.join(directory, "movie.gif"))
+        return {"steps": len(planner.path) - 1}
+    return run
+
+
+def peak_rss_mb():
+    """
+    Get the peak resident set size of the current process.
+
+    Returns:
+        float: Peak RSS in megabytes, or None where ``resource`` is unavailable.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def measure(stage, nx, ny, repeats=3, seed=0, memory=True):
+    """
+    Measure one stage on one maze size in the current process.
+
+    Args:
+        stage (str): Name of a registered stage.
+        nx (int): Width of the maze.
+        ny (int): Height of the maze.
+        repeats (int): Number of timed runs; the fastest is kept (default: 3).
+        seed (int): Seed of the maze and of the training (default: 0).
+        memory (bool): Whether to make one more run under ``tracemalloc`` to record
+            its peak traced memory (default: True).
+
+    Returns:
+        dict: The stage, maze size, best ``seconds``, ``peak_rss_mb`` (of the whole
+        process, setup included), ``tracemalloc_peak_mb`` and the extra results
+        of the stage, with per-step and per-epoch costs where they apply.
+    """
+    function, _ = STAGES[stage]
+    run = function(nx, ny, np.random.default_rng(seed))
+
+    seconds = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        extra = run()
+        seconds = min(seconds, time.perf_counter() - started)
+
+    result = {"stage": stage, "nx": nx, "ny": ny, "cells": nx * ny, "seconds": seconds}
+    for counter in ("steps", "epochs"):
+        if extra.get(counter):
+            result[f"seconds_per_{counter[:-1]}"] = seconds / extra[counter]
+    result.update(extra)
+
+    if memory:
+        tracemalloc.start()
+        try:
+            run()
+            result["tracemalloc_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_benchmarks(stages=None, sizes=DEFAULT_SIZES, repeats=3, seed=0, memory=True, time_limit=10.0):
+    """
+    Benchmark stages over a range of square maze sizes.
+
+    Every measurement runs in a fresh worker process, so that peak RSS is not
+    inherited from earlier measurements. A stage stops scaling at its
+    ``max_cells`` limit or after the first size whose run took longer than
+    ``time_limit`` seconds, which is the largest size feasible for it.
+
+    Args:
+        stages (list): Names of the stages to run (default: all registered).
+        sizes (list): Side lengths of the square mazes (default: ``DEFAULT_SIZES``).
+        repeats (int): Number of timed runs per measurement (default: 3).
+        seed (int): Seed of the mazes and the training (default: 0).
+        memory (bool): Whether to record traced memory peaks (default: True).
+        time_limit (float): Time in seconds after which larger sizes are skipped (default: 10.0).
+
+    Returns:
+        list: One result dict per measurement, see ``measure``.
+    """
+    results = []
+    for stage in stages or STAGES:
+        _, max_cells = STAGES[stage]
+        for side in sorted(sizes):
+            if max_cells is not None and side * side > max_cells:
+                break
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(measure, stage, side, side, repeats, seed, memory).result()
+            results.append(result)
+            if result["seconds"] > time_limit:
+                break
+    return results
+
+
+def environment():
+    """
+    Describe the environment the benchmarks run in.
+
+    Returns:
+        dict: Python, NumPy and platform versions, CPU count and the date.
+    """
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save_results(results, filename):
+    """
+    Write benchmark results and their environment to a JSON file.
+
+    Args:
+        results (list): Result dicts from ``run_benchmarks``.
+        filename (str): Path of the JSON file to write.
+    """
+    with open(filename, "w") as file:
+        json.dump({"environment": environment(), "results": results}, file, indent=2)
+
+
+def load_results(filename):
+    """
+    Read benchmark results written by ``save_results``.
+
+    Args:
+        filename (str): Path of the JSON file.
+
+    Returns:
+        list: The result dicts.
+    """
+    with open(filename) as file:
+        return json.load(file)["results"]
+
+
+def compare(results, baseline, threshold=0.25, min_seconds=0.01):
+    """
+    Find measurements that regressed against a baseline.
+
+    Measurements are matched by stage and maze size. A metric regressed when it
+    grew by more than ``threshold`` relative to the baseline; timings below
+    ``min_seconds`` in both runs are too noisy to compare and are skipped.
+
+    Args:
+        results (list): Current result dicts.
+        baseline (list): Baseline result dicts.
+        threshold (float): Allowed relative increase (default: 0.25, i.e. 25%).
+        min_seconds (float): Smallest timing that is compared (default: 0.01).
+
+    Returns:
+        list: One dict per regression with the ``stage``, ``nx``, ``ny``, ``metric``,
+        ``baseline`` and ``current`` values and their ``ratio``.
+    """
+    reference = {(row["stage"], row["nx"], row["ny"]): row for row in baseline}
+    regressions = []
+    for row in results:
+        old = reference.get((row["stage"], row["nx"], row["ny"]))
+        if old is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if row.get(metric) is None or old.get(metric) is None:
+                continue
+            if metric == "seconds" and max(row[metric], old[metric]) < min_seconds:
+                continue
+            if row[metric] > old[metric] * (1 + threshold):
+                regressions.append({"stage": row["stage"], "nx": row["nx"], "ny": row["ny"],
+                                    "metric": metric, "baseline": old[metric], "current": row[metric],
+                                    "ratio": row[metric] / max(old[metric], 1e-12)})
+    return regressions
+
+
+def main():
+    """Run the benchmarks described on the command line and print a report."""
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the maze pipeline.")
+    parser.add_argument("--stages", nargs="+", choices=sorted(STAGES), default=None,
+                        help="stages to run (default: all)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="side lengths of the square mazes")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per measurement")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the mazes and the training")
+    parser.add_argument("--time-limit", type=float, default=10.0,
+                        help="seconds after which a stage stops scaling")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--output", default="benchmark.json", help="JSON file to write")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative regression against the baseline")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.stages, args.sizes, args.repeats, args.seed,
+                             not args.no_memory, args.time_limit)
+    save_results(results, args.output)
+
+    print(f"{'stage':<20}{'size':>12}{'seconds':>12}{'peak RSS MB':>14}{'traced MB':>12}")
+    for row in results:
+        traced = row.get("tracemalloc_peak_mb")
+        print(f"{row['stage']:<20}{str(row['nx']) + 'x' + str(row['ny']):>12}{row['seconds']:>12.4f}"
+              f"{row['peak_rss_mb'] or 0:>14.1f}{traced if traced is not None else float('nan'):>12.2f}")
+    print(f"Results saved as '{args.output}'")
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['stage']} {regression['nx']}x{regression['ny']} "
+                  f"{regression['metric']}: {regression['baseline']:.4g} -> "
+                  f"{regression['current']:.4g} ({regression['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against '{args.baseline}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+On-disk cache of feasibilities and trained agents.
+
+Building the feasibility of a maze and training an agent on it are by far the
+most expensive steps of a solve. This module stores both on disk, keyed by the
+content hash of the maze (``Maze.content_hash``) and, for agents, by the
+training hyperparameters, so that repeated solves of the same maze only load
+two ``.npz`` files. The cache is bounded in size: when it grows beyond
+``max_bytes`` the least recently used entries are evicted.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from convert import Feasibility
+from learn import Agent
+
+
+class SolutionCache:
+    """
+    Content-addressed, size-bounded LRU cache of feasibilities and agents.
+
+    Every entry is one ``.npz`` file in ``directory`` named after its key. The
+    modification time of a file records its last use, so the LRU order survives
+    across processes.
+
+    Attributes:
+        directory (str): Directory holding the cache entries.
+        max_bytes (int): Total size above which entries are evicted.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that had to compute the entry.
+    """
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        """
+        Open (and create if needed) a cache directory.
+
+        Args:
+            directory (str): Directory holding the cache entries.
+            max_bytes (int): Total size above which entries are evicted (default: 1 GiB).
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def agent_key(maze_hash, **hyperparameters):
+        """
+        Build the key of an agent trained on a maze with given hyperparameters.
+
+        Args:
+            maze_hash (str): Content hash of the maze.
+            **hyperparameters: Training settings, e.g. gamma, lrn_rate, epochs, seed.
+
+        Returns:
+            str: Hexadecimal SHA-256 digest.
+        """
+        settings = json.dumps(hyperparameters, sort_keys=True)
+        return hashlib.sha256(f"{maze_hash}:{settings}".encode()).hexdigest()
+
+    def path(self, kind, key):
+        """
+        Get the file path of an entry.
+
+        Args:
+            kind (str): Kind of entry, "feasibility" or "agent".
+            key (str): Key of the entry.
+
+        Returns:
+            str: Path of the ``.npz`` file.
+        """
+        return os.path.join(self.directory, f"{kind}-{key}.npz")
+
+    def feasibility(self, maze, maze_hash=None):
+        """
+        Get the feasibility of a maze, building and storing it on a miss.
+
+        Args:
+            maze (Maze): The maze.
+            maze_hash (str): Content hash of the maze, if already known.
+
+        Returns:
+            Feasibility: The sparse feasibility of the maze.
+        """
+        filename = self.path("feasibility", maze_hash or maze.content_hash())
+        if self._touch(filename):
+            return Feasibility.load(filename)
+        feasibility = Feasibility(maze, dense=False)
+        self._store(filename, feasibility)
+        return feasibility
+
+    def solve(self, maze, gamma=0.8, lrn_rate=0.9, epochs=1000, seed=None, **train_options):
+        """
+        Get an agent trained on a maze, training and storing it on a miss.
+
+        Training is only reproducible for an integer ``seed``; with the default
+        None, any agent trained with the same settings is returned.
+
+        Args:
+            maze (Maze): The maze to solve.
+            gamma (float): Discount factor (default: 0.8).
+            lrn_rate (float): Learning rate (default: 0.9).
+            epochs (int): Maximum number of training epochs (default: 1000).
+            seed (int): Seed of the training (default: None).
+            **train_options: Further keyword arguments of ``Agent.train`` that
+                change the result, such as ``tol`` and ``patience``.
+
+        Returns:
+            tuple: The feasibility of the maze and the trained agent.
+        """
+        maze_hash = maze.content_hash()
+        feasibility = self.feasibility(maze, maze_hash)
+        key = self.agent_key(maze_hash, gamma=gamma, lrn_rate=lrn_rate, epochs=epochs, seed=seed,
+                             start=list(maze.start), **train_options)
+        filename = self.path("agent", key)
+        if self._touch(filename):
+            return feasibility, Agent.load(filename, feasibility)
+
+        agent = Agent(feasibility, gamma=gamma, lrn_rate=lrn_rate, maze=maze,
+                      start_x=maze.start[0], start_y=maze.start[1])
+        agent.train(epochs=epochs, rng=seed, **train_options)
+        self._store(filename, agent)
+        return feasibility, agent
+
+    def size(self):
+        """
+        Get the total size of the cache entries.
+
+        Returns:
+            int: Size in bytes.
+        """
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in ``max_bytes``.
+
+        Returns:
+            int: Number of entries deleted.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        evicted = 0
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+            evicted += 1
+        return evicted
+
+    def clear(self):
+        """Delete every entry of the cache."""
+        for entry in self._entries():
+            os.remove(entry.path)
+
+    def _entries(self):
+        """Cache entry files, as ``os.DirEntry`` objects."""
+        return [entry for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.endswith(".npz")]
+
+    def _touch(self, filename):
+        """Count a lookup and mark the entry as just used; False if it does not exist."""
+        try:
+            os.utime(filename)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def _store(self, filename, item):
+        """Write an entry atomically, then evict old entries if the cache is too large."""
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                item.save(file)
+            os.replace(temporary, filename)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        self.evict()
@@ -3,8 +3,61 @@ Cell module for maze generation.
 
 This module defines the Cell class used to represent individual cells in a maze grid.
 Each cell maintains information about its walls and can interact with neighboring cells.
+Cells can either own their walls or act as views onto a wall bitmask array.
 """
 
+from collections.abc import MutableMapping
+
+# Bit used for each wall in a wall bitmask
+WALL_BITS = {'N': 1, 'S': 2, 'W': 4, 'E': 8}
+ALL_WALLS = 15
+
+
+class WallView(MutableMapping):
+    """
+    Dictionary-like view of the walls of one cell stored in a wall bitmask array.
+
+    Reading and writing the view reads and writes the bitmask, so a Cell using
+    it stays in sync with the maze it was taken from. Iteration follows the
+    order of ``Cell.walls`` ('N', 'S', 'E', 'W').
+
+    Attributes:
+        bitmask (np.ndarray): 2D array of wall bitmasks indexed by [x, y].
+        x (int): X-coordinate of the cell.
+        y (int): Y-coordinate of the cell.
+    """
+    order = ('N', 'S', 'E', 'W')
+
+    def __init__(self, bitmask, x, y):
+        """
+        Initialize the view.
+
+        Args:
+            bitmask (np.ndarray): 2D array of wall bitmasks indexed by [x, y].
+            x (int): X-coordinate of the cell.
+            y (int): Y-coordinate of the cell.
+        """
+        self.bitmask = bitmask
+        self.x, self.y = x, y
+
+    def __getitem__(self, wall):
+        return bool(self.bitmask[self.x, self.y] & WALL_BITS[wall])
+
+    def __setitem__(self, wall, present):
+        if present:
+            self.bitmask[self.x, self.y] |= WALL_BITS[wall]
+        else:
+            self.bitmask[self.x, self.y] &= ~WALL_BITS[wall] & ALL_WALLS
+
+    def __delitem__(self, wall):
+        raise TypeError("Walls cannot be deleted, set them to False instead")
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __len__(self):
+        return len(self.order)
+
 
 class Cell:
     """
@@ -22,16 +75,20 @@ class Cell:
     """
     wall_pairs = {'N': 'S', 'S': 'N', 'E': 'W', 'W': 'E'}
 
-    def __init__(self, x, y):
+    def __init__(self, x, y, walls=None):
         """
         Initialize a new cell at the given coordinates.
 
         Args:
             x (int): X-coordinate of the cell.
             y (int): Y-coordinate of the cell.
+            walls (MutableMapping): Existing walls to use, e.g. a WallView onto a
+                maze bitmask. A new cell with all four walls is created if omitted.
         """
         self.x, self.y = x, y
-        self.walls = {'N': True, 'S': True, 'E': True, 'W': True}
+        if walls is None:
+            walls = {'N': True, 'S': True, 'E': True, 'W': True}
+        self.walls = walls
         self.status = None
 
     def has_all_walls(self):
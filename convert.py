@@ -3,12 +3,21 @@ Maze to feasibility matrix conversion module.
 
 This module converts maze structures into mathematical representations suitable
 for reinforcement learning algorithms. It creates feasibility matrices that
-encode the connectivity between maze cells.
+encode the connectivity between maze cells, either as a dense N x N matrix or
+as a sparse neighbour table that only stores the (at most four) neighbours of
+every cell.
 """
 
 import numpy as np
+from cell import WALL_BITS
 from maze import Maze
 
+# Sentinel used in the neighbour table for directions blocked by a wall
+NO_NEIGHBOR = -1
+
+# Number of cells whose walls are read at a time when building connectivity
+EDGE_CHUNK_CELLS = 1 << 20
+
 
 def find_reachable_neighbors(maze, cell):
     """
@@ -28,6 +37,100 @@ def find_reachable_neighbors(maze, cell):
     return neighbors
 
 
+def find_edges(walls, ny, delta, y0=0):
+    """
+    Find all open passages of a block of maze rows with whole-array operations.
+
+    For every direction, the cells whose wall bit for that direction is clear
+    are found in one vectorized test, and their state numbers and those of the
+    neighbours they open onto are emitted as edge arrays. Blocks are ranges of
+    whole rows, which maze files store contiguously, so a block of a
+    memory-mapped maze is one contiguous read.
+
+    Args:
+        walls (np.ndarray): Wall bitmasks of rows ``y0`` onwards, indexed by [x, y].
+        ny (int): Height of the maze.
+        delta (dict): Direction vectors, in neighbour table column order (``Maze.delta``).
+        y0 (int): Y-coordinate of the first row of ``walls`` (default: 0).
+
+    Returns:
+        tuple: ``int64`` arrays of the source states, the target states and the
+        neighbour table column (direction) of every directed edge.
+    """
+    nx, rows = walls.shape
+    # The copy reads the block in storage order but lays the cells out in
+    # state order (x * ny + y), so the table is then filled sequentially
+    cell_walls = np.ascontiguousarray(walls).reshape(-1)
+    all_sources, all_targets, all_actions = [], [], []
+    for column, (direction, (dx, dy)) in enumerate(delta.items()):
+        sources = np.flatnonzero((cell_walls & WALL_BITS[direction]) == 0)
+        if rows != ny:
+            # Position x * rows + (y - y0) in the block to state x * ny + y
+            sources += (sources // rows) * (ny - rows)
+        sources += y0
+        all_sources.append(sources)
+        all_targets.append(sources + (dx * ny + dy))
+        all_actions.append(np.full(sources.size, column, dtype=np.int64))
+    return np.concatenate(all_sources), np.concatenate(all_targets), np.concatenate(all_actions)
+
+
+class NeighborIndex:
+    """
+    Compressed sparse row (CSR) index of the successors of every state.
+
+    The successors of state ``s`` are stored contiguously in
+    ``indices[indptr[s]:indptr[s + 1]]``, so looking them up costs O(degree)
+    regardless of the number of states.
+
+    Attributes:
+        indptr (np.ndarray): Offsets into ``indices``, one per state plus one.
+        indices (np.ndarray): Concatenated successor state numbers.
+        actions (np.ndarray): Neighbour table column (direction) of every entry in
+            ``indices``.
+    """
+
+    def __init__(self, indptr, indices, actions):
+        """
+        Initialize the index from CSR arrays.
+
+        Args:
+            indptr (np.ndarray): Offsets into ``indices``, one per state plus one.
+            indices (np.ndarray): Concatenated successor state numbers.
+            actions (np.ndarray): Direction column of every entry in ``indices``.
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.actions = actions
+
+    @classmethod
+    def from_table(cls, neighbors):
+        """
+        Build the index from a fixed-width neighbour table.
+
+        Args:
+            neighbors (np.ndarray): Neighbour table using ``NO_NEIGHBOR`` as sentinel.
+
+        Returns:
+            NeighborIndex: The successor index.
+        """
+        valid = neighbors != NO_NEIGHBOR
+        indptr = np.zeros(neighbors.shape[0] + 1, dtype=np.int64)
+        np.cumsum(valid.sum(axis=1), out=indptr[1:])
+        return cls(indptr, neighbors[valid], np.nonzero(valid)[1])
+
+    def successors(self, state):
+        """
+        Get the states directly reachable from the given state.
+
+        Args:
+            state (int): State number to look up.
+
+        Returns:
+            np.ndarray: View of the reachable state numbers.
+        """
+        return self.indices[self.indptr[state]:self.indptr[state + 1]]
+
+
 class Feasibility:
     """
     Converts maze structure into a feasibility matrix for reinforcement learning.
@@ -36,42 +139,176 @@ class Feasibility:
     maze is assigned a unique number, and the matrix indicates which cells are
     directly connected (reachable without crossing walls).
 
+    Connectivity is always stored in a sparse neighbour table of shape (cells, 4)
+    whose columns follow the order of ``Maze.delta`` and whose blocked entries hold
+    ``NO_NEIGHBOR``. The dense matrix needs O(N^2) memory and is only built when
+    ``dense`` is True.
+
+    State numbers are ``x * ny + y``; ``to_state`` and ``to_coords`` convert
+    between state numbers and cell coordinates in O(1), for scalars and arrays.
+
     Attributes:
+        nx (int): Width of the maze.
+        ny (int): Height of the maze.
         cells (int): Total number of cells in the maze.
-        F_matrix (np.ndarray): Binary matrix indicating cell connectivity.
-        numbered_grid (np.ndarray): 2D array mapping cell coordinates to unique numbers.
+        F_matrix (np.ndarray): Binary matrix indicating cell connectivity, or None
+            when the feasibility was built in sparse mode.
+        neighbors (np.ndarray): Neighbour table with one row per cell and one column
+            per direction.
+        neighbor_index (NeighborIndex): CSR successor index, built once on first use.
+        numbered_grid (np.ndarray): 2D array mapping cell coordinates to unique numbers,
+            built on first use.
     """
 
-    def __init__(self, maze_):
+    def __init__(self, maze_, dense=True, neighbors_file=None):
         """
         Initialize the feasibility matrix from a maze.
 
         Args:
             maze_ (Maze): The maze object to convert into a feasibility matrix.
+            dense (bool): Whether to also build the dense N x N matrix (default: True).
+            neighbors_file (str): Optional ``.npy`` path to keep the neighbour table
+                in a memory-mapped file instead of in memory, for mazes opened with
+                ``Maze.open`` that are larger than RAM.
         """
-        self.cells = maze_.maze_grid.shape[0] * maze_.maze_grid.shape[1]
-        self.F_matrix = np.zeros(shape=[self.cells, self.cells], dtype=int)
-        self.numbered_grid = np.arange(self.cells).reshape(
-            (maze_.maze_grid.shape[0], maze_.maze_grid.shape[1]))
+        self.nx, self.ny = maze_.nx, maze_.ny
+        self.cells = maze_.nx * maze_.ny
+        self.F_matrix = None
+        if dense:
+            self.F_matrix = np.zeros(shape=[self.cells, self.cells], dtype=int)
+        shape = (self.cells, len(maze_.delta))
+        if neighbors_file is None:
+            self.neighbors = np.empty(shape, dtype=np.int64)
+        else:
+            self.neighbors = np.lib.format.open_memmap(
+                neighbors_file, mode="w+", dtype=np.int64, shape=shape)
+        self._numbered_grid = None
+        self._neighbor_index = None
         self.get_neighbors(maze_)
 
+    @property
+    def numbered_grid(self):
+        """np.ndarray: 2D array mapping cell coordinates to state numbers, built on first use."""
+        if self._numbered_grid is None:
+            self._numbered_grid = np.arange(self.cells).reshape((self.nx, self.ny))
+        return self._numbered_grid
+
+    def to_state(self, x, y):
+        """
+        Convert cell coordinates to state numbers.
+
+        Args:
+            x (int or np.ndarray): X-coordinates of the cells.
+            y (int or np.ndarray): Y-coordinates of the cells.
+
+        Returns:
+            int or np.ndarray: State numbers ``x * ny + y``.
+        """
+        return x * self.ny + y
+
+    def to_coords(self, state):
+        """
+        Convert state numbers to cell coordinates.
+
+        Args:
+            state (int or np.ndarray): State numbers.
+
+        Returns:
+            tuple: X- and y-coordinates of the cells, scalars or arrays like ``state``.
+        """
+        return divmod(state, self.ny)
+
+    @property
+    def neighbor_index(self):
+        """NeighborIndex: CSR successor index built from the neighbour table."""
+        if self._neighbor_index is None:
+            self._neighbor_index = NeighborIndex.from_table(self.neighbors)
+        return self._neighbor_index
+
     def get_neighbors(self, maze: Maze):
         """
         Populate the feasibility matrix with cell connectivity information.
 
-        This method iterates through all cells in the maze and marks connected
-        cells in the feasibility matrix. The matrix is symmetric since if cell A
-        can reach cell B, then cell B can also reach cell A.
+        The open passages are found with whole-array operations on the wall
+        bitmask (see ``find_edges``) and scattered into the neighbour table (and
+        the dense matrix, if built) in one shot. The connectivity is symmetric
+        since if cell A can reach cell B, then cell B can also reach cell A.
 
         Args:
             maze (Maze): The maze object to analyze for connectivity.
         """
-        for x in range(maze.nx):
-            for y in range(maze.ny):
-                cell_number = self.numbered_grid[x][y]
-                neighbors = find_reachable_neighbors(
-                    maze, maze.maze_grid[x][y])
-                for neighbor in neighbors:
-                    neighbor_number = self.numbered_grid[neighbor.x][neighbor.y]
-                    self.F_matrix[cell_number][neighbor_number] = 1
-                    self.F_matrix[neighbor_number][cell_number] = 1
+        self._neighbor_index = None
+        self.neighbors[:] = NO_NEIGHBOR
+        # Read blocks of whole rows, which are contiguous in maze files, so
+        # memory-mapped mazes are read sequentially and only one block at a time
+        rows = max(1, EDGE_CHUNK_CELLS // maze.nx)
+        for y0 in range(0, maze.ny, rows):
+            sources, targets, actions = find_edges(maze.walls[:, y0:y0 + rows], maze.ny, maze.delta, y0)
+            self.neighbors[sources, actions] = targets
+            if self.F_matrix is not None:
+                self.F_matrix[sources, targets] = 1
+                self.F_matrix[targets, sources] = 1
+
+    def successors(self, state):
+        """
+        Get the states directly reachable from the given state.
+
+        Args:
+            state (int): State number to look up.
+
+        Returns:
+            np.ndarray: Reachable state numbers (at most four).
+        """
+        return self.neighbor_index.successors(state)
+
+    def to_dense(self):
+        """
+        Build the dense N x N feasibility matrix from the neighbour table.
+
+        Returns:
+            np.ndarray: Binary matrix indicating cell connectivity.
+        """
+        if self.F_matrix is not None:
+            return self.F_matrix
+        f_matrix = np.zeros(shape=[self.cells, self.cells], dtype=int)
+        states, directions = np.nonzero(self.neighbors != NO_NEIGHBOR)
+        f_matrix[states, self.neighbors[states, directions]] = 1
+        return f_matrix
+
+    def save(self, filename):
+        """
+        Write the neighbour table to an uncompressed ``.npz`` file.
+
+        Only the neighbour table and the maze size are stored; the dense matrix
+        and the successor index are rebuilt from them when needed.
+
+        Args:
+            filename (str): Path or open binary file to write.
+        """
+        np.savez(filename, neighbors=np.asarray(self.neighbors),
+                 shape=np.array((self.nx, self.ny), dtype=np.int64))
+
+    @classmethod
+    def load(cls, filename, dense=False):
+        """
+        Read a feasibility written by ``save`` without needing the maze.
+
+        Args:
+            filename (str): Path or open binary file to read.
+            dense (bool): Whether to also build the dense N x N matrix (default: False).
+
+        Returns:
+            Feasibility: The loaded feasibility.
+        """
+        with np.load(filename) as data:
+            neighbors, (nx, ny) = data["neighbors"], data["shape"].tolist()
+        feasibility = cls.__new__(cls)
+        feasibility.nx, feasibility.ny = nx, ny
+        feasibility.cells = nx * ny
+        feasibility.neighbors = neighbors
+        feasibility._numbered_grid = None
+        feasibility._neighbor_index = None
+        feasibility.F_matrix = None
+        if dense:
+            feasibility.F_matrix = feasibility.to_dense()
+        return feasibility
@@ -6,7 +6,10 @@ of agent movement through the maze. It uses PIL (Pillow) for image generation an
 supports both static maze images and animated GIFs showing solution paths.
 """
 
-from cell import Cell
+from functools import lru_cache
+
+from cell import Cell, WALL_BITS
+from gifwriter import GifWriter
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
@@ -15,6 +18,11 @@ margin = 80          # Image margin in pixels
 cell_side = 100      # Cell size in pixels
 line_thickness = 10  # Wall thickness in pixels
 
+# Palette used for movie frames: the maze colours take the first entries and the
+# agent colour is always the last one
+AGENT_RGB = (0, 0, 255)
+AGENT_INDEX = 255
+
 
 class PathNotFound(Exception):
     """
@@ -35,6 +43,25 @@ class PathNotFound(Exception):
         super().__init__(self.message)
 
 
+@lru_cache(maxsize=None)
+def load_font(size=18):
+    """
+    Load the label font, falling back to PIL's default font if it is missing.
+
+    Fonts are cached, so the font file is only read once per size.
+
+    Args:
+        size (int): Font size in points (default: 18).
+
+    Returns:
+        ImageFont: The loaded font.
+    """
+    try:
+        return ImageFont.truetype("Arial Unicode.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
 def draw_cell(cell, image, color="black", count=0, wide=5, method="grid"):
     """
     Draw a single cell of the maze with its walls and labels.
@@ -68,25 +95,13 @@ def draw_cell(cell, image, color="black", count=0, wide=5, method="grid"):
 
     # Add text labels for special cells (Start/End)
     if cell.status == 'Start' or cell.status == 'End':
-        try:
-            font = ImageFont.truetype("Arial Unicode.ttf", 18)
-            image.text((x - 25, y - 10), cell.status.upper(),
-                       (255, 0, 0), font=font)
-        except OSError:
-            font = ImageFont.load_default()
-            image.text((x - 25, y - 10), cell.status.upper(),
-                       (255, 0, 0), font=font)
+        image.text((x - 25, y - 10), cell.status.upper(),
+                   (255, 0, 0), font=load_font())
     else:
         # Add cell numbers for grid visualization
         if method == "grid":
-            try:
-                font = ImageFont.truetype("Arial Unicode.ttf", 18)
-                image.text((x - 35, y - 35), str(count),
-                           fill="#D3D3D3", font=font)
-            except OSError:
-                font = ImageFont.load_default()
-                image.text((x - 35, y - 35), str(count),
-                           fill="#D3D3D3", font=font)
+            image.text((x - 35, y - 35), str(count),
+                       fill="#D3D3D3", font=load_font())
 
 
 def draw_grid(image, x_cells, y_cells):
@@ -107,43 +122,222 @@ def draw_image(maze_img, cells):
         draw_cell(cell, maze_img, method="not_grid")
 
 
-def draw_agent(cell, image, color="blue"):
+def agent_box(cell):
+    """
+    Get the bounding box of the agent drawn in a cell.
+
+    Args:
+        cell (Cell): The cell the agent is in.
+
+    Returns:
+        tuple: Pixel box (left, top, right, bottom), right and bottom exclusive.
+    """
     x = margin + line_thickness + cell.x * cell_side
     y = margin + line_thickness + cell.y * cell_side
+    radius = cell_side / 3
+    return int(x - radius), int(y - radius), int(x + radius) + 2, int(y + radius) + 2
+
+
+def draw_agent(cell, image, color="blue", offset=(0, 0)):
+    x = margin + line_thickness + cell.x * cell_side - offset[0]
+    y = margin + line_thickness + cell.y * cell_side - offset[1]
     image.ellipse((x - cell_side / 3, y - cell_side / 3, x +
                   cell_side / 3, y + cell_side / 3), fill=color)
 
 
-def make_movie(maze, feasibility, path, filename="maze_path.gif"):
-    """Function for drawing a visualization of how the agent moves through the labyrinth."""
-    images = []
-    width, height = (margin + cell_side * dim for dim in maze.maze_grid.shape)
+def render_maze(maze):
+    """
+    Render the static maze layer: the numbered grid, the walls and the labels.
+
+    Args:
+        maze (Maze): The maze to render.
+
+    Returns:
+        Image: RGB image of the maze.
+    """
+    width, height = (margin + cell_side * dim for dim in (maze.nx, maze.ny))
+    img = Image.new("RGB", (width, height), (255, 255, 255))
+    draw_image(ImageDraw.Draw(img), maze.maze_grid)
+    return img
+
+
+def render_palette_maze(maze):
+    """
+    Render the maze layer as a palette-mode image for movie frames.
+
+    The maze colours are quantized into the first 255 palette entries and the
+    agent colour is stored at ``AGENT_INDEX``, so every frame can share one
+    global palette.
+
+    Args:
+        maze (Maze): The maze to render.
+
+    Returns:
+        Image: Palette-mode image of the maze.
+    """
+    background = render_maze(maze).convert("P", palette=Image.ADAPTIVE, colors=AGENT_INDEX)
+    palette = background.getpalette()[:3 * AGENT_INDEX]
+    palette += [0] * (3 * AGENT_INDEX - len(palette))
+    background.putpalette(palette + list(AGENT_RGB))
+    return background
+
+
+def make_movie(maze, feasibility, path, filename="maze_path.gif", stride=1, duration=400):
+    """
+    Function for drawing a visualization of how the agent moves through the labyrinth.
+
+    The maze itself is rendered once, in palette mode. Frames are encoded into the
+    GIF as they are produced: the first frame covers the whole maze and every
+    following frame only the dirty rectangle around the previous and the current
+    agent position. Peak memory is therefore one frame, regardless of the
+    length of the path.
 
+    Args:
+        maze (Maze): The maze the agent moves through.
+        feasibility (Feasibility): Feasibility object used to number the cells.
+        path (list): Sequence of states visited by the agent.
+        filename (str): Path of the GIF file to write (default: "maze_path.gif").
+        stride (int): Only draw every ``stride``-th position of long paths; the
+            final position is always drawn (default: 1).
+        duration (int): Display time of every frame in milliseconds (default: 400).
+    """
     if 'break' in path:
         raise PathNotFound
 
-    for position in path:
-        ind1 = np.where(feasibility.numbered_grid == position)[0][0]
-        ind2 = np.where(feasibility.numbered_grid == position)[1][0]
-        cell = maze.maze_grid[ind1, ind2]
+    positions = list(path[::stride])
+    if (len(path) - 1) % stride:
+        positions.append(path[-1])
 
-        im = Image.new('RGB', (width, height), (255, 255, 255))
-        draw = ImageDraw.Draw(im)
-        draw_image(draw, maze.maze_grid)
-        draw_agent(cell, draw)
-        images.append(im)
+    background = render_palette_maze(maze)
+    with GifWriter(filename, background, duration=duration) as writer:
+        previous = None
+        for position in positions:
+            cell = maze.cell_at(*feasibility.to_coords(position))
 
-    images[0].save(filename, save_all=True, append_images=images[1:],
-                   optimize=False, duration=400, loop=0)
+            box = agent_box(cell)
+            if previous is None:
+                region = (0, 0) + background.size
+            else:
+                region = (min(box[0], previous[0]), min(box[1], previous[1]),
+                          max(box[2], previous[2]), max(box[3], previous[3]))
+            frame = background.crop(region)
+            draw_agent(cell, ImageDraw.Draw(frame), AGENT_INDEX, offset=region[:2])
+            writer.write(frame, region[:2])
+            previous = box
 
 
-def draw_maze(maze, filename="maze.png"):
-    """Function for drawing a static image of the maze."""
-    width, height = (margin + cell_side * dim for dim in maze.maze_grid.shape)
-    img = Image.new("RGB", (width, height), (255, 255, 255))
-    cells = maze.maze_grid
-    maze_img = ImageDraw.Draw(img)
-    draw_grid(maze_img, cells.shape[0], cells.shape[1])
-    for cell in cells.flatten():
-        draw_cell(cell, maze_img, method="not_grid")
+def _paint_lines(canvas, segments, origin, side, wide, color):
+    """
+    Paint grid lines that run along the rows of a pixel buffer.
+
+    Line ``k`` is centred on pixel row ``origin + k * side`` and segment ``i`` of
+    a line spans the pixel columns of cell ``i``, extended by half the line width
+    at both ends like PIL's wide lines.
+
+    Args:
+        canvas (np.ndarray): Pixel buffer (or a transposed view of it), rows first.
+        segments (np.ndarray): Boolean array (lines, cells) of segments to paint.
+        origin (int): Pixel position of line 0 and of the left edge of cell 0.
+        side (int): Cell size in pixels.
+        wide (int): Line width in pixels.
+        color (tuple): RGB colour of the lines.
+    """
+    n_lines, n_cells = segments.shape
+    radius = wide // 2
+    columns = np.zeros((n_lines, canvas.shape[1]), dtype=bool)
+    columns[:, origin:origin + n_cells * side] = np.repeat(segments, side, axis=1)
+    painted = columns.copy()
+    for shift in range(1, radius + 1):
+        painted[:, :-shift] |= columns[:, shift:]
+        painted[:, shift:] |= columns[:, :-shift]
+
+    rows = origin + np.arange(n_lines)[:, None] * side + np.arange(-radius, wide - radius)
+    band = canvas[rows]
+    band[np.broadcast_to(painted[:, None, :], band.shape[:3])] = color
+    canvas[rows] = band
+
+
+def rasterize_maze(maze, side=None, border=None, thickness=None, wide=5, grid=True):
+    """
+    Rasterize the maze into a pixel buffer with whole-array NumPy operations.
+
+    This is a faster alternative to drawing every wall with ``ImageDraw``: the
+    wall bitmask is expanded into line masks and painted into the buffer with
+    slice assignments, one pass for horizontal and one for vertical lines. The
+    layout matches ``render_maze``, without the cell numbers and labels.
+
+    With ``side=1`` the maze is rasterized at one pixel per cell instead: cells
+    are the odd pixels of a (2 * ny + 1, 2 * nx + 1) image and walls the pixels
+    between them, with the start and end cells marked in red.
+
+    Args:
+        maze (Maze): The maze to rasterize.
+        side (int): Cell size in pixels (default: the module's ``cell_side``).
+        border (int): Image margin in pixels (default: the module's ``margin``).
+        thickness (int): Wall offset in pixels (default: the module's ``line_thickness``).
+        wide (int): Wall line width in pixels (default: 5).
+        grid (bool): Whether to paint the light gray grid under the walls (default: True).
+
+    Returns:
+        np.ndarray: ``uint8`` RGB pixel buffer of shape (height, width, 3).
+    """
+    walls = np.asarray(maze.walls).T
+    if side == 1:
+        buffer = np.zeros((2 * maze.ny + 1, 2 * maze.nx + 1, 3), dtype=np.uint8)
+        buffer[1::2, 1::2] = 255
+        buffer[1::2, 2:-1:2][(walls[:, :-1] & WALL_BITS['E']) == 0] = 255
+        buffer[2:-1:2, 1::2][(walls[:-1, :] & WALL_BITS['S']) == 0] = 255
+        for x, y in (maze.start, maze.end):
+            buffer[2 * y + 1, 2 * x + 1] = (255, 0, 0)
+        return buffer
+
+    side = cell_side if side is None else side
+    border = margin if border is None else border
+    thickness = line_thickness if thickness is None else thickness
+    origin = border + thickness - side // 2
+    width = max(border + side * maze.nx, origin + side * maze.nx + wide)
+    height = max(border + side * maze.ny, origin + side * maze.ny + wide)
+    buffer = np.full((height, width, 3), 255, dtype=np.uint8)
+
+    # Horizontal lines k = 0..ny run along rows, vertical lines along columns
+    horizontal = np.zeros((maze.ny + 1, maze.nx), dtype=bool)
+    horizontal[:-1] = walls & WALL_BITS['N']
+    horizontal[1:] |= (walls & WALL_BITS['S']).astype(bool)
+    vertical = np.zeros((maze.nx + 1, maze.ny), dtype=bool)
+    vertical[:-1] = walls.T & WALL_BITS['W']
+    vertical[1:] |= (walls.T & WALL_BITS['E']).astype(bool)
+
+    if grid:
+        _paint_lines(buffer, np.ones_like(horizontal), origin, side, wide, (211, 211, 211))
+        _paint_lines(buffer.transpose(1, 0, 2), np.ones_like(vertical), origin, side, wide,
+                     (211, 211, 211))
+    _paint_lines(buffer, horizontal, origin, side, wide, (0, 0, 0))
+    _paint_lines(buffer.transpose(1, 0, 2), vertical, origin, side, wide, (0, 0, 0))
+    return buffer
+
+
+def draw_maze(maze, filename="maze.png", backend="pil", side=None):
+    """
+    Function for drawing a static image of the maze.
+
+    Args:
+        maze (Maze): The maze to draw.
+        filename (str): Path of the image file to write (default: "maze.png").
+        backend (str): "pil" draws every cell with ``ImageDraw``, including cell
+            numbers; "numpy" uses the much faster ``rasterize_maze`` and only adds
+            the start and end labels (default: "pil").
+        side (int): Cell size in pixels for the "numpy" backend, 1 for one pixel
+            per cell (default: the module's ``cell_side``).
+    """
+    if backend == "pil":
+        render_maze(maze).save(filename)
+        return
+    if backend != "numpy":
+        raise ValueError(f"Unknown drawing backend '{backend}', expected 'pil' or 'numpy'")
+
+    img = Image.fromarray(rasterize_maze(maze, side))
+    if side is None or side == cell_side:
+        label = ImageDraw.Draw(img)
+        for cell in (maze.cell_at(*maze.start), maze.cell_at(*maze.end)):
+            draw_cell(cell, label, count=0, method="not_grid")
     img.save(filename)
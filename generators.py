@@ -0,0 +1,439 @@
+"""
+Maze generation algorithms.
+
+This module contains a registry of maze generation algorithms. Every algorithm
+builds a perfect maze (exactly one path between any two cells) and returns its
+walls as a 2D ``uint8`` array of wall bitmasks (see ``cell.WALL_BITS``) indexed
+by [x, y]. The algorithms trade throughput against the character of the maze:
+
+- backtracker: long winding corridors, few dead ends (sequential)
+- eller: row by row in O(width) memory, can be streamed
+- binary_tree: whole-array NumPy operations, strong diagonal bias
+- sidewinder: whole-array NumPy operations, one open top row
+- kruskal: union-find over randomly ordered walls, many short dead ends
+- wilson: loop-erased random walks, uniform spanning tree
+
+All randomness is drawn from an explicit ``numpy.random.Generator``, so equal
+seeds give bit-identical mazes.
+"""
+
+import numpy as np
+from cell import WALL_BITS, ALL_WALLS
+
+# Registered generators, by name
+GENERATORS = {}
+
+NORTH, SOUTH, WEST, EAST = (WALL_BITS[direction] for direction in ('N', 'S', 'W', 'E'))
+
+
+def register_generator(name):
+    """
+    Register a maze generation algorithm under the given name.
+
+    A generator is called as ``generator(nx, ny, start, rng)``, where ``rng`` is a
+    ``numpy.random.Generator`` providing all of its randomness, and returns a tuple
+    ``(walls, end, distance)``, where ``walls`` is the wall bitmask array, ``end``
+    is the flat index (``x * ny + y``) of the cell farthest from the start and
+    ``distance`` its number of moves from the start. Generators that do not
+    track distances return None for both, and the caller finds the end with a
+    breadth-first search.
+
+    Args:
+        name (str): Name used to select the algorithm.
+
+    Returns:
+        callable: Decorator registering the generator function.
+    """
+    def decorator(function):
+        GENERATORS[name] = function
+        return function
+    return decorator
+
+
+def get_generator(name):
+    """
+    Look up a registered maze generation algorithm.
+
+    Args:
+        name (str): Name of the algorithm.
+
+    Returns:
+        callable: The generator function.
+
+    Raises:
+        ValueError: If no algorithm is registered under that name.
+    """
+    try:
+        return GENERATORS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown maze generation algorithm '{name}', expected one of {sorted(GENERATORS)}") from None
+
+
+def bfs_distances(walls, start):
+    """
+    Compute the number of moves from a start cell to every cell of a maze.
+
+    The search expands whole BFS levels at once over the flattened bitmask.
+
+    Args:
+        walls (np.ndarray): 2D array of wall bitmasks indexed by [x, y].
+        start (int): Flat index (``x * ny + y``) of the start cell.
+
+    Returns:
+        np.ndarray: Flat int64 array of distances, -1 for unreachable cells.
+    """
+    ny = walls.shape[1]
+    flat = walls.reshape(-1)
+    distances = np.full(flat.size, -1, dtype=np.int64)
+    distances[start] = 0
+    frontier = np.array([start], dtype=np.int64)
+    level = 0
+    while frontier.size:
+        level += 1
+        candidates = np.concatenate([frontier[(flat[frontier] & bit) == 0] + step
+                                     for bit, step in ((NORTH, -1), (SOUTH, 1), (WEST, -ny), (EAST, ny))])
+        candidates = np.unique(candidates[distances[candidates] == -1])
+        distances[candidates] = level
+        frontier = candidates
+    return distances
+
+
+def _carve(walls, cell, other, bit, opposite_bit):
+    """Remove the wall between two adjacent cells of a flat bitmask buffer."""
+    walls[cell] &= ALL_WALLS ^ bit
+    walls[other] &= ALL_WALLS ^ opposite_bit
+
+
+def _to_array(walls, nx, ny):
+    """Convert a flat bitmask buffer into a 2D wall array indexed by [x, y]."""
+    return np.frombuffer(walls, dtype=np.uint8).reshape(nx, ny).copy()
+
+
+@register_generator("backtracker")
+def backtracker(nx, ny, start, rng):
+    """
+    Generate a maze with the iterative recursive backtracking algorithm.
+
+    The algorithm carves from the start into random unvisited neighbours and
+    backtracks along an explicit stack of flat cell indices when it gets stuck.
+    In a perfect maze the stack depth at which a cell is first visited is its
+    distance from the start, so the farthest cell is found while carving.
+
+    Args:
+        nx (int): Width of the maze.
+        ny (int): Height of the maze.
+        start (list): Starting coordinates [x, y].
+        rng (np.random.Generator): Source of randomness.
+
+    Returns:
+        tuple: Wall bitmask array, flat index of the farthest cell and its distance.
+    """
+    n = nx * ny
+    north, south, west, east = (NORTH, SOUTH, -1), (SOUTH, NORTH, 1), (WEST, EAST, -ny), (EAST, WEST, ny)
+
+    walls = bytearray([ALL_WALLS]) * n
+    visited = bytearray(n)
+    cell_stack = []
+    current = start[0] * ny + start[1]
+    visited[current] = 1
+    n_visited = 1
+    farthest, max_depth = current, 0
+    # Every cell except the start is carved into exactly once, with one draw each
+    draws = rng.random(n).tolist()
+
+    while n_visited < n:
+        x, y = divmod(current, ny)
+        neighbors = []
+        if y > 0 and not visited[current - 1]:
+            neighbors.append(north)
+        if y < ny - 1 and not visited[current + 1]:
+            neighbors.append(south)
+        if x > 0 and not visited[current - ny]:
+            neighbors.append(west)
+        if x < nx - 1 and not visited[current + ny]:
+            neighbors.append(east)
+
+        if not neighbors:
+            # Backtrack to previous cell
+            current = cell_stack.pop()
+            continue
+
+        # Choose random neighbor and carve passage
+        bit, opposite_bit, step = neighbors[int(draws[n_visited] * len(neighbors))]
+        _carve(walls, current, current + step, bit, opposite_bit)
+        cell_stack.append(current)
+        current += step
+        visited[current] = 1
+        n_visited += 1
+
+        # Track the cell farthest from the start
+        if len(cell_stack) > max_depth:
+            farthest, max_depth = current, len(cell_stack)
+
+    return _to_array(walls, nx, ny), farthest, max_depth
+
+
+def eller_rows(nx, ny, rng=None):
+    """
+    Generate a maze row by row with Eller's algorithm.
+
+    Only the set membership of the current row is kept, so memory is O(nx)
+    regardless of the height of the maze. Rows are numbered by y; each yielded
+    row is final, including the north walls opened by the previous row.
+
+    Args:
+        nx (int): Width of the maze.
+        ny (int): Height of the maze.
+        rng (np.random.Generator): Source of randomness, or a seed for
+            ``np.random.default_rng`` (default: None, fresh entropy).
+
+    Yields:
+        np.ndarray: ``uint8`` wall bitmasks of one row, indexed by x.
+    """
+    rng = np.random.default_rng(rng)
+    sets = list(range(nx))
+    next_set = nx
+    open_north = [False] * nx
+
+    for y in range(ny):
+        row = bytearray(ALL_WALLS ^ NORTH if open_north[x] else ALL_WALLS for x in range(nx))
+        # A row needs at most nx - 1 join, nx carve and nx fallback draws
+        draws = iter(rng.random(3 * nx).tolist())
+
+        # Union-find over the set labels of this row
+        parent = {label: label for label in sets}
+
+        def find(label):
+            while parent[label] != label:
+                parent[label] = parent[parent[label]]
+                label = parent[label]
+            return label
+
+        # Join adjacent cells of different sets; the last row joins all of them
+        last_row = y == ny - 1
+        for x in range(nx - 1):
+            left, right = find(sets[x]), find(sets[x + 1])
+            if left != right and (last_row or next(draws) < 0.5):
+                parent[right] = left
+                row[x] &= ALL_WALLS ^ EAST
+                row[x + 1] &= ALL_WALLS ^ WEST
+        sets = [find(label) for label in sets]
+
+        if last_row:
+            yield np.array(row, dtype=np.uint8)
+            break
+
+        # Carve down from at least one cell of every set
+        members = {}
+        for x, label in enumerate(sets):
+            members.setdefault(label, []).append(x)
+        open_north = [False] * nx
+        for cells in members.values():
+            down = [x for x in cells if next(draws) < 0.5]
+            if not down:
+                down = [cells[int(next(draws) * len(cells))]]
+            for x in down:
+                open_north[x] = True
+                row[x] &= ALL_WALLS ^ SOUTH
+
+        # Cells not connected from above start new sets
+        for x in range(nx):
+            if not open_north[x]:
+                sets[x] = next_set
+                next_set += 1
+        yield np.array(row, dtype=np.uint8)
+
+
+@register_generator("eller")
+def eller(nx, ny, start, rng):
+    """
+    Generate a maze with Eller's algorithm (see ``eller_rows``).
+
+    Args:
+        nx (int): Width of the maze.
+        ny (int): Height of the maze.
+        start (list): Starting coordinates [x, y] (unused by the algorithm).
+        rng (np.random.Generator): Source of randomness.
+
+    Returns:
+        tuple: Wall bitmask array, None and None.
+    """
+    walls = np.empty((nx, ny), dtype=np.uint8)
+    for y, row in enumerate(eller_rows(nx, ny, rng)):
+        walls[:, y] = row
+    return walls, None, None
+
+
+@register_generator("binary_tree")
+def binary_tree(nx, ny, start, rng):
+    """
+    Generate a maze with the binary tree algorithm using whole-array operations.
+
+    Every cell independently opens its north or west wall at random; cells on
+    the top row can only open west and cells on the left column only north.
+
+    Args:
+        nx (int): Width of the maze.
+        ny (int): Height of the maze.
+        start (list): Starting coordinates [x, y] (unused by the algorithm).
+        rng (np.random.Generator): Source of randomness.
+
+    Returns:
+        tuple: Wall bitmask array, None and None.
+    """
+    walls = np.full((nx, ny), ALL_WALLS, dtype=np.uint8)
+    x, y = np.meshgrid(np.arange(nx), np.arange(ny), indexing="ij")
+    carve_north = ((rng.random((nx, ny)) < 0.5) | (x == 0)) & (y > 0)
+    carve_west = ~carve_north & (x > 0)
+
+    walls[carve_north] &= ALL_WALLS ^ NORTH
+    walls[:, :-1][carve_north[:, 1:]] &= ALL_WALLS ^ SOUTH
+    walls[carve_west] &= ALL_WALLS ^ WEST
+    walls[:-1, :][carve_west[1:, :]] &= ALL_WALLS ^ EAST
+    return walls, None, None
+
+
+@register_generator("sidewinder")
+def sidewinder(nx, ny, start, rng):
+    """
+    Generate a maze with the sidewinder algorithm using whole-array operations.
+
+    The top row is one open corridor. In every other row, cells are grouped into
+    runs by randomly closing the run after each cell; cells inside a run open
+    their east wall and one random cell of every run opens its north wall.
+
+    Args:
+        nx (int): Width of the maze.
+        ny (int): Height of the maze.
+        start (list): Starting coordinates [x, y] (unused by the algorithm).
+        rng (np.random.Generator): Source of randomness.
+
+    Returns:
+        tuple: Wall bitmask array, None and None.
+    """
+    walls = np.full((nx, ny), ALL_WALLS, dtype=np.uint8)
+    x, y = np.meshgrid(np.arange(nx), np.arange(ny), indexing="ij")
+    close_run = ((rng.random((nx, ny)) < 0.5) & (y > 0)) | (x == nx - 1)
+
+    carve_east = ~close_run
+    walls[carve_east] &= ALL_WALLS ^ EAST
+    walls[1:, :][carve_east[:-1, :]] &= ALL_WALLS ^ WEST
+
+    # Label runs: a new run starts after every closed cell of a row
+    run_start = np.zeros((nx, ny), dtype=np.int64)
+    run_start[1:, :] = close_run[:-1, :]
+    runs = (np.cumsum(run_start, axis=0) + y * nx).ravel()
+
+    # Pick a random member of every run below the top row to open north
+    priority = rng.random(nx * ny)
+    order = np.lexsort((priority, runs))
+    last_in_run = np.ones(order.size, dtype=bool)
+    last_in_run[:-1] = runs[order][1:] != runs[order][:-1]
+    chosen = order[last_in_run]
+    chosen = chosen[chosen % ny > 0]
+
+    flat = walls.reshape(-1)
+    flat[chosen] &= ALL_WALLS ^ NORTH
+    flat[chosen - 1] &= ALL_WALLS ^ SOUTH
+    return walls, None, None
+
+
+@register_generator("kruskal")
+def kruskal(nx, ny, start, rng):
+    """
+    Generate a maze with randomized Kruskal's algorithm.
+
+    All interior walls are visited in random order and removed whenever the
+    cells on both sides are not yet connected, tracked with a union-find.
+
+    Args:
+        nx (int): Width of the maze.
+        ny (int): Height of the maze.
+        start (list): Starting coordinates [x, y] (unused by the algorithm).
+        rng (np.random.Generator): Source of randomness.
+
+    Returns:
+        tuple: Wall bitmask array, None and None.
+    """
+    n = nx * ny
+    walls = bytearray([ALL_WALLS]) * n
+    parent = list(range(n))
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    edges = [(cell, cell + 1, SOUTH, NORTH) for cell in range(n) if cell % ny < ny - 1]
+    edges += [(cell, cell + ny, EAST, WEST) for cell in range(n - ny)]
+
+    for position in rng.permutation(len(edges)).tolist():
+        cell, other, bit, opposite_bit = edges[position]
+        root, other_root = find(cell), find(other)
+        if root != other_root:
+            parent[other_root] = root
+            _carve(walls, cell, other, bit, opposite_bit)
+
+    return _to_array(walls, nx, ny), None, None
+
+
+@register_generator("wilson")
+def wilson(nx, ny, start, rng):
+    """
+    Generate a maze with Wilson's algorithm (uniform spanning tree).
+
+    Starting from a tree containing only the start cell, a random walk is run
+    from every cell not yet in the tree until it hits the tree. The loop-erased
+    walk, obtained by remembering the last exit direction of every cell, is
+    then added to the tree.
+
+    Args:
+        nx (int): Width of the maze.
+        ny (int): Height of the maze.
+        start (list): Starting coordinates [x, y].
+        rng (np.random.Generator): Source of randomness.
+
+    Returns:
+        tuple: Wall bitmask array, None and None.
+    """
+    n = nx * ny
+    walls = bytearray([ALL_WALLS]) * n
+    in_tree = bytearray(n)
+    in_tree[start[0] * ny + start[1]] = 1
+    exits = [None] * n
+    north, south, west, east = (NORTH, SOUTH, -1), (SOUTH, NORTH, 1), (WEST, EAST, -ny), (EAST, WEST, ny)
+
+    # Random walk steps are drawn in blocks
+    draws, used = rng.random(n).tolist(), 0
+
+    for origin in rng.permutation(n).tolist():
+        # Random walk until the tree is hit, remembering the last exit of every cell
+        current = origin
+        while not in_tree[current]:
+            x, y = divmod(current, ny)
+            options = []
+            if y > 0:
+                options.append(north)
+            if y < ny - 1:
+                options.append(south)
+            if x > 0:
+                options.append(west)
+            if x < nx - 1:
+                options.append(east)
+            if used == len(draws):
+                draws, used = rng.random(n).tolist(), 0
+            exits[current] = options[int(draws[used] * len(options))]
+            used += 1
+            current += exits[current][2]
+
+        # Add the loop-erased walk to the tree
+        current = origin
+        while not in_tree[current]:
+            bit, opposite_bit, step = exits[current]
+            _carve(walls, current, current + step, bit, opposite_bit)
+            in_tree[current] = 1
+            current += step
+
+    return _to_array(walls, nx, ny), None, None
@@ -0,0 +1,68 @@
+"""
+Streaming GIF writer module.
+
+This module writes animated GIFs one frame at a time, so only the frame being
+encoded has to be kept in memory. All frames are palette-mode (P) images that
+share the global palette written in the file header, and a frame may cover only
+a part of the canvas (a dirty rectangle) that is composited over the previous
+frame.
+"""
+
+from PIL import GifImagePlugin
+
+
+class GifWriter:
+    """
+    Incrementally encodes palette-mode frames into an animated GIF file.
+
+    The writer can be used as a context manager; the GIF trailer is written and
+    the file closed when the context exits.
+
+    Attributes:
+        filename (str): Path of the GIF file being written.
+        duration (int): Display time of every frame in milliseconds.
+        frames (int): Number of frames written so far.
+    """
+
+    def __init__(self, filename, canvas, duration=400, loop=0):
+        """
+        Open the GIF file and write its header.
+
+        Args:
+            filename (str): Path of the GIF file to write.
+            canvas (Image): Palette-mode image defining the canvas size and the
+                global palette shared by all frames.
+            duration (int): Display time of every frame in milliseconds (default: 400).
+            loop (int): Number of times to loop the animation, 0 for forever (default: 0).
+        """
+        self.filename = filename
+        self.duration = duration
+        self.frames = 0
+        header, _ = GifImagePlugin.getheader(canvas.copy(), info={"loop": loop, "duration": duration})
+        self.file = open(filename, "wb")
+        self.file.write(b"".join(header))
+
+    def write(self, frame, offset=(0, 0)):
+        """
+        Encode a frame and append it to the file.
+
+        Args:
+            frame (Image): Palette-mode frame using the global palette's indices.
+            offset (tuple): Position (x, y) of the frame on the canvas, for frames
+                covering only a dirty rectangle (default: (0, 0)).
+        """
+        for chunk in GifImagePlugin.getdata(frame, offset, duration=self.duration):
+            self.file.write(chunk)
+        self.frames += 1
+
+    def close(self):
+        """Write the GIF trailer and close the file."""
+        if not self.file.closed:
+            self.file.write(b";")
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
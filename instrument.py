@@ -0,0 +1,215 @@
+"""
+Training instrumentation module.
+
+This module provides observers for ``Agent.train``. An observer is notified at
+the start and end of training and after every episode, and can ask the agent
+to time the two halves of every step (successor lookup and Bellman update) or
+to report a sample of the individual steps. Training without observers only
+pays a flag check per step, so instrumentation can stay available in
+production code paths.
+
+Built-in observers:
+- TrainingStats: counters for steps per episode, updates/sec, lookup vs update
+  time and the largest Q-value change of every episode
+- StepTrace: a sampled trace of individual Q-value updates
+- TrainingProfiler: a cProfile run of the whole training
+"""
+
+import cProfile
+import io
+import pstats
+from time import perf_counter
+
+import numpy as np
+
+
+class TrainingObserver:
+    """
+    Base class of the observers of ``Agent.train``; every hook does nothing.
+
+    Attributes:
+        timed (bool): Whether the agent should time the successor lookup and the
+            Bellman update of every step, which costs two clock reads per step.
+        trace_every (int): Report every ``trace_every``-th step to ``on_step``, or
+            0 for no step reports. With several observers, steps are reported at
+            the smallest non-zero rate requested.
+    """
+    timed = False
+    trace_every = 0
+
+    def on_train_start(self, agent, epochs):
+        """
+        Called before the first episode.
+
+        Args:
+            agent (Agent): The agent being trained.
+            epochs (int): Maximum number of episodes of this training.
+        """
+
+    def on_step(self, agent, epoch, state, action, next_state, delta):
+        """
+        Called for the sampled steps, see ``trace_every``.
+
+        Args:
+            agent (Agent): The agent being trained.
+            epoch (int): Number of the current episode, starting at 1.
+            state (int): State the update was made for.
+            action (int): Action taken.
+            next_state (int): State the action led to.
+            delta (float): Change of the Q-value.
+        """
+
+    def on_episode_end(self, agent, epoch, steps, max_delta, lookup_time, update_time):
+        """
+        Called after every episode.
+
+        Args:
+            agent (Agent): The agent being trained.
+            epoch (int): Number of the episode, starting at 1.
+            steps (int): Number of Q-value updates in the episode.
+            max_delta (float): Largest Q-value change of the episode.
+            lookup_time (float): Seconds spent in successor lookups since the
+                start of training, 0.0 unless an observer is ``timed``.
+            update_time (float): Seconds spent in Bellman updates since the
+                start of training, 0.0 unless an observer is ``timed``.
+        """
+
+    def on_train_end(self, agent):
+        """
+        Called when training stops, after the last episode or on convergence.
+
+        Args:
+            agent (Agent): The trained agent.
+        """
+
+
+class TrainingStats(TrainingObserver):
+    """
+    Collects per-episode counters of a training run.
+
+    Attributes:
+        episode_steps (list): Number of Q-value updates of every episode.
+        max_deltas (list): Largest Q-value change of every episode.
+        lookup_time (float): Total seconds spent in successor lookups.
+        update_time (float): Total seconds spent in Bellman updates.
+        seconds (float): Wall time of the whole training.
+    """
+
+    def __init__(self, timed=True):
+        """
+        Initialize the counters.
+
+        Args:
+            timed (bool): Whether to time lookups and updates separately (default: True).
+        """
+        self.timed = timed
+        self.episode_steps = []
+        self.max_deltas = []
+        self.lookup_time = 0.0
+        self.update_time = 0.0
+        self.seconds = 0.0
+        self._started = None
+
+    def on_train_start(self, agent, epochs):
+        self._started = perf_counter()
+
+    def on_episode_end(self, agent, epoch, steps, max_delta, lookup_time, update_time):
+        self.episode_steps.append(steps)
+        self.max_deltas.append(max_delta)
+        self.lookup_time, self.update_time = lookup_time, update_time
+
+    def on_train_end(self, agent):
+        self.seconds = perf_counter() - self._started
+
+    @property
+    def steps(self):
+        """int: Total number of Q-value updates."""
+        return int(sum(self.episode_steps))
+
+    @property
+    def updates_per_sec(self):
+        """float: Q-value updates per second of wall time."""
+        return self.steps / max(self.seconds, 1e-9)
+
+    def summary(self):
+        """
+        Summarize the counters.
+
+        Returns:
+            dict: Number of ``episodes`` and ``steps``, the ``mean_steps`` and
+            ``max_steps`` per episode, ``updates_per_sec``, the ``lookup_time`` and
+            ``update_time``, the ``final_max_delta`` and the wall time ``seconds``.
+        """
+        episode_steps = np.array(self.episode_steps, dtype=np.int64)
+        return {
+            "episodes": len(episode_steps),
+            "steps": self.steps,
+            "mean_steps": float(episode_steps.mean()) if len(episode_steps) else 0.0,
+            "max_steps": int(episode_steps.max()) if len(episode_steps) else 0,
+            "updates_per_sec": self.updates_per_sec,
+            "lookup_time": self.lookup_time,
+            "update_time": self.update_time,
+            "final_max_delta": self.max_deltas[-1] if self.max_deltas else 0.0,
+            "seconds": self.seconds,
+        }
+
+
+class StepTrace(TrainingObserver):
+    """
+    Records a sample of the individual Q-value updates.
+
+    Attributes:
+        records (list): Tuples (epoch, state, action, next_state, delta), at most
+            ``limit`` of them.
+    """
+
+    def __init__(self, every=1000, limit=100000):
+        """
+        Initialize the trace.
+
+        Args:
+            every (int): Record every ``every``-th step (default: 1000).
+            limit (int): Maximum number of records kept (default: 100000).
+        """
+        self.trace_every = every
+        self.limit = limit
+        self.records = []
+
+    def on_step(self, agent, epoch, state, action, next_state, delta):
+        if len(self.records) < self.limit:
+            self.records.append((epoch, int(state), int(action), int(next_state), delta))
+
+
+class TrainingProfiler(TrainingObserver):
+    """
+    Runs the whole training under ``cProfile``.
+
+    Attributes:
+        profile (cProfile.Profile): The profile of the last training run.
+    """
+
+    def __init__(self):
+        """Initialize the profiler."""
+        self.profile = None
+
+    def on_train_start(self, agent, epochs):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def on_train_end(self, agent):
+        self.profile.disable()
+
+    def report(self, sort="cumulative", limit=20):
+        """
+        Format the profile of the last training run.
+
+        Args:
+            sort (str): ``pstats`` sort key (default: "cumulative").
+            limit (int): Number of functions listed (default: 20).
+
+        Returns:
+            str: The profile statistics.
+        """
+        stream = io.StringIO()
+        pstats.Stats(self.profile, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
@@ -6,47 +6,268 @@ exploring the environment and updating Q-values based on rewards and future
 state values using the Bellman equation.
 """
 
+import heapq
+import warnings
 from array import array
-from random import random, randint
+from time import perf_counter
+from typing import NamedTuple
 
 import numpy as np
 from convert import find_reachable_neighbors
-from convert import Feasibility
+from convert import Feasibility, NeighborIndex, NO_NEIGHBOR
+from seeding import derive_seed
 
 
-def get_possible_next_states(state: int, f_matrix: np.array, n_states: int) -> list[int]:
+# Rules for combining colliding updates in Agent.train_batched
+COLLISION_RULES = ("last", "mean")
+
+# Number of uniform draws taken from the generator at a time by Agent.train
+DRAW_BLOCK = 4096
+
+# Reasons a walk ends, see WalkResult
+WALK_REASONS = ("goal", "loop", "stuck", "max_steps")
+
+# Update schedulers of Agent.train
+SCHEDULERS = ("uniform", "replay", "prioritized")
+
+
+def get_possible_next_states(state: int, f_matrix, n_states: int) -> list[int]:
     """
     Get all possible next states from the current state.
 
     Args:
         state (int): Current state number.
-        f_matrix (np.array): Feasibility matrix indicating valid transitions.
+        f_matrix (np.array | Feasibility): Feasibility matrix indicating valid
+            transitions, or a ``Feasibility``, whose neighbour index answers in
+            O(degree) instead of scanning a matrix row.
         n_states (int): Total number of states in the environment.
 
     Returns:
         list[int]: List of state numbers that can be reached from the current state.
     """
-    poss_next_states = []
-    for j in range(n_states):
-        if f_matrix[state, j] == 1:
-            poss_next_states.append(j)
-    return poss_next_states
+    if isinstance(f_matrix, Feasibility):
+        return f_matrix.neighbor_index.successors(state).tolist()
+    return np.flatnonzero(f_matrix[state, :n_states] == 1).tolist()
 
 
-def get_random_next_state(state, f_matrix, n_states) -> int:
+def get_random_next_state(state, f_matrix, n_states, rng=None) -> int:
     """
     Randomly select a valid next state from the current state.
 
     Args:
         state (int): Current state number.
-        f_matrix (np.array): Feasibility matrix indicating valid transitions.
+        f_matrix (np.array | Feasibility): Feasibility matrix indicating valid
+            transitions, or a ``Feasibility`` (see ``get_possible_next_states``).
         n_states (int): Total number of states in the environment.
+        rng (np.random.Generator): Source of randomness, or a seed for
+            ``np.random.default_rng`` (default: None, fresh entropy).
 
     Returns:
         int: Randomly selected valid next state.
     """
     possible_states = get_possible_next_states(state, f_matrix, n_states)
-    return possible_states[np.random.randint(0, len(possible_states))]
+    return possible_states[np.random.default_rng(rng).integers(0, len(possible_states))]
+
+
+class WalkResult(NamedTuple):
+    """
+    Outcome of ``Agent.walk``.
+
+    Attributes:
+        path (np.ndarray): ``int64`` states visited, start first.
+        success (bool): Whether the goal was reached.
+        reason (str): Why the walk ended, one of ``WALK_REASONS``: "goal", "loop"
+            (the policy returned to a visited state), "stuck" (no valid move) or
+            "max_steps".
+    """
+    path: np.ndarray
+    success: bool
+    reason: str
+
+
+class ReplayBuffer:
+    """
+    Fixed-capacity ring buffer of transitions held in preallocated arrays.
+
+    Once full, every new transition overwrites the oldest one.
+
+    Attributes:
+        capacity (int): Maximum number of transitions held.
+        states (np.ndarray): States the transitions start from.
+        actions (np.ndarray): Actions taken.
+        rewards (np.ndarray): Rewards received.
+        next_states (np.ndarray): States the actions led to.
+        size (int): Number of transitions held.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Allocate the buffer.
+
+        Args:
+            capacity (int): Maximum number of transitions held.
+        """
+        if capacity <= 0:
+            raise ValueError("The capacity of a replay buffer must be positive.")
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+        self._position = 0
+
+    def add(self, state: int, action: int, reward: float, next_state: int):
+        """
+        Store a transition, overwriting the oldest one if the buffer is full.
+
+        Args:
+            state (int): State the transition starts from.
+            action (int): Action taken.
+            reward (float): Reward received.
+            next_state (int): State the action led to.
+        """
+        position = self._position
+        self.states[position] = state
+        self.actions[position] = action
+        self.rewards[position] = reward
+        self.next_states[position] = next_state
+        self._position = (position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, n: int, rng: np.random.Generator):
+        """
+        Draw transitions uniformly, with replacement.
+
+        Args:
+            n (int): Number of transitions.
+            rng (np.random.Generator): Source of randomness.
+
+        Returns:
+            tuple: Arrays of the states, actions, rewards and next states.
+        """
+        picked = rng.integers(0, self.size, size=n)
+        return self.states[picked], self.actions[picked], self.rewards[picked], self.next_states[picked]
+
+
+class _Convergence:
+    """Early-stopping test of ``Agent.train``, fed the largest Q-value change of every epoch."""
+
+    def __init__(self, agent, tol, patience):
+        self.agent = agent
+        self.tol = tol
+        self.patience = patience
+        self.stable_epochs = 0
+        self.last_length = -1
+
+    def update(self, max_delta: float) -> bool:
+        """Record the end of an epoch; True once training has converged."""
+        if self.tol is None:
+            return False
+        # Small Q-value changes and a stable, valid greedy path
+        length = self.agent.greedy_path_length()
+        if (length != -1 and length == self.last_length
+                and max_delta <= self.tol * self._scale()):
+            self.stable_epochs += 1
+        else:
+            self.stable_epochs = 0
+        self.last_length = length
+        return self.stable_epochs >= self.patience
+
+    def _scale(self) -> float:
+        """Largest absolute Q-value of an action not blocked by a wall."""
+        q = self.agent.Q
+        valid = self.agent.valid_actions
+        return max(float(q.max(where=valid, initial=0.0)), -float(q.min(where=valid, initial=0.0)))
+
+
+class GreedyPolicy:
+    """
+    Deterministic policy toward one goal, answering path queries for many starts.
+
+    The policy is a table of the next state chosen in every state. On
+    construction, pointer jumping over that table finds in O(N log N)
+    whole-array operations which states lead to the goal and in how many moves,
+    so a query only costs the length of the paths it returns, and starts caught
+    in a loop or a dead end are recognised without walking them.
+
+    Attributes:
+        next_states (np.ndarray): Next state chosen in every state, ``NO_NEIGHBOR``
+            where the policy has no move.
+        goal (int): Goal state number.
+        distances (np.ndarray): Number of moves from every state to the goal, -1
+            for states whose policy never reaches it.
+    """
+
+    def __init__(self, next_states: np.ndarray, goal: int):
+        """
+        Initialize the policy and compute the distances to the goal.
+
+        Args:
+            next_states (np.ndarray): Next state chosen in every state.
+            goal (int): Goal state number.
+        """
+        self.next_states = next_states
+        self.goal = goal
+        n_states = len(next_states)
+
+        # States without a move lead to an extra absorbing state; the goal absorbs itself
+        jumps = np.append(np.where(next_states == NO_NEIGHBOR, n_states, next_states), n_states)
+        jumps[goal] = goal
+        moves = np.ones(n_states + 1, dtype=np.int64)
+        moves[goal] = moves[n_states] = 0
+        # After k rounds jumps[s] is the 2**k-th state after s and moves[s] counts the moves
+        # made before reaching the goal, so log2(N) rounds resolve every path
+        for _ in range(max(1, int(n_states).bit_length())):
+            moves += moves[jumps]
+            jumps = jumps[jumps]
+        self.distances = np.where(jumps[:n_states] == goal, moves[:n_states], -1)
+
+    def rollout(self, starts):
+        """
+        Follow the policy from many starts at once.
+
+        Args:
+            starts (array-like): Start state numbers.
+
+        Returns:
+            tuple: A list with the path (``int64`` array of states, start first) of
+            every start and a boolean array telling which paths reach the goal.
+            Paths that do not reach the goal stop before the first state the policy
+            would visit twice, or at the dead end.
+        """
+        starts = np.asarray(starts, dtype=np.int64).reshape(-1)
+        distances = self.distances[starts]
+        success = distances >= 0
+
+        # Successful paths are written into one buffer, one move for all walkers at a time
+        lengths = np.where(success, distances + 1, 0)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        buffer = np.empty(offsets[-1], dtype=np.int64)
+        walkers = np.flatnonzero(success)
+        current = starts[walkers]
+        buffer[offsets[walkers]] = current
+        for move in range(1, int(distances.max(initial=0)) + 1):
+            active = distances[walkers] >= move
+            walkers, current = walkers[active], self.next_states[current[active]]
+            buffer[offsets[walkers] + move] = current
+
+        paths = []
+        for number, start in enumerate(starts.tolist()):
+            if success[number]:
+                paths.append(buffer[offsets[number]:offsets[number + 1]])
+            else:
+                paths.append(self._failed_path(start))
+        return paths, success
+
+    def _failed_path(self, state):
+        """Path of a start that never reaches the goal, up to its loop or dead end."""
+        visited, path = set(), []
+        while state != NO_NEIGHBOR and state not in visited:
+            visited.add(state)
+            path.append(state)
+            state = int(self.next_states[state])
+        return np.array(path, dtype=np.int64)
 
 
 class Agent:
@@ -57,15 +278,32 @@ class Agent:
     It maintains Q-values for state-action pairs and updates them using the
     Bellman equation during training.
 
+    Actions are the four movement directions, in the column order of the
+    feasibility's neighbour table (``Maze.delta`` order). Q and R therefore
+    have one row per state and one column per action, which keeps memory
+    linear in the number of cells. Actions blocked by a wall are never taken.
+    The tables and walk buffers are allocated on first use, so an agent that
+    is only used for graph searches (see ``plan.Planner``) stays as small as
+    the feasibility's neighbour table.
+
     Attributes:
         gamma (float): Discount factor for future rewards (0 < gamma <= 1).
         lrn_rate (float): Learning rate for Q-value updates (0 < lrn_rate <= 1).
-        path (list): Sequence of states representing the agent's path.
-        Q (np.ndarray): Q-value matrix for state-action pairs.
-        R (np.ndarray): Reward matrix for state transitions.
+        path (list): Legacy path list, extended by ``walk`` with ``record_path``.
+        Q (np.ndarray): Q-value table of shape (n_states, 4) in float32; actions blocked by walls hold -inf.
+        R (np.ndarray): Reward table of shape (n_states, 4) in float32, filled by ``set_rewards``.
+        neighbors (np.ndarray): Sparse neighbour table shared with the feasibility,
+            mapping (state, action) to the next state.
+        valid_actions (np.ndarray): Boolean mask of the actions not blocked by walls,
+            built on first use.
+        neighbor_index (NeighborIndex): Successor index shared with the feasibility,
+            built on first use.
         start (int): Starting state number.
         goal (int): Goal state number.
         n_states (int): Total number of states in the environment.
+        epochs_trained (int): Number of epochs run by the last call to ``train``.
+        steps_trained (int): Number of Q-value updates made by the last call to ``train``.
+        converged (bool): Whether the last call to ``train`` stopped early.
     """
 
     def __init__(self, feasibility: Feasibility, gamma: float, lrn_rate: float, maze, start_x: int, start_y: int):
@@ -83,89 +321,755 @@ class Agent:
         self.gamma: float = gamma
         self.lrn_rate: float = lrn_rate
         self.path: list = []
-        self.Q: np.ndarray = np.zeros(
-            shape=[feasibility.cells, feasibility.cells], dtype=int)
-        self.R: np.ndarray = np.copy(feasibility.F_matrix)
-        self.start: int = feasibility.numbered_grid[start_x, start_y]
-        self.goal: int = feasibility.numbered_grid[maze.end[0], maze.end[1]]
+        self.neighbors: np.ndarray = feasibility.neighbors
+        self.start: int = feasibility.to_state(start_x, start_y)
+        self.goal: int = feasibility.to_state(maze.end[0], maze.end[1])
         self.n_states: int = feasibility.cells
-        self.set_rewards()
+        self.epochs_trained: int = 0
+        self.steps_trained: int = 0
+        self.converged: bool = False
+        self._policies: dict = {}  # GreedyPolicy by (kind, goal), kind "q" or "bfs"
+        self._bind(feasibility)
+
+    def _bind(self, feasibility: Feasibility):
+        """Share the feasibility and drop the tables, which are rebuilt on first use."""
+        self._feasibility = feasibility
+        self._valid_actions = None
+        self._Q = None
+        self._R = None
+        self._walk_path = None
+        self._visit_stamps = None
+        self._walk_stamp = 0
+
+    @property
+    def valid_actions(self) -> np.ndarray:
+        """np.ndarray: Boolean mask of the actions not blocked by walls, built on first use."""
+        if self._valid_actions is None:
+            self._valid_actions = self.neighbors != NO_NEIGHBOR
+        return self._valid_actions
+
+    @property
+    def neighbor_index(self) -> NeighborIndex:
+        """NeighborIndex: Successor index shared with the feasibility, built on first use."""
+        return self._feasibility.neighbor_index
+
+    @property
+    def Q(self) -> np.ndarray:
+        """np.ndarray: Q-value table, zero for every action not blocked by a wall until trained."""
+        if self._Q is None:
+            # Actions blocked by walls hold -inf, so a plain argmax never picks them
+            self._Q = np.zeros(shape=self.neighbors.shape, dtype=np.float32)
+            self._Q[~self.valid_actions] = -np.inf
+        return self._Q
+
+    @Q.setter
+    def Q(self, value: np.ndarray):
+        self._Q = value
+
+    @property
+    def R(self) -> np.ndarray:
+        """np.ndarray: Reward table, filled by ``set_rewards`` on first use."""
+        if self._R is None:
+            self._R = np.zeros(shape=self.neighbors.shape, dtype=np.float32)
+            self.set_rewards()
+        return self._R
+
+    @R.setter
+    def R(self, value: np.ndarray):
+        self._R = value
+
+    def _allocate_walk_buffers(self):
+        """Allocate the path buffer and visit stamps reused by every ``walk``."""
+        # A walk visits every state at most once, so n_states entries hold any path
+        self._walk_path = np.empty(self.n_states, dtype=np.int64)
+        # A state was visited by the current walk if its stamp equals _walk_stamp
+        self._visit_stamps = np.zeros(self.n_states, dtype=np.int64)
+        self._walk_stamp = 0
 
     def set_rewards(self):
         """
-        Set up the reward matrix for the learning environment.
+        Set up the reward table for the learning environment.
 
         This method configures rewards to encourage the agent to reach the goal:
         - Small negative reward (-0.1) for regular moves to encourage efficiency
         - Large positive reward (1000.0) for reaching the goal state
         """
-        previous = get_possible_next_states(
-            self.goal, self.R, self.n_states)[0]
-        self.R = np.where(self.R == 1, -0.1, self.R)
-        self.R[previous, self.goal] = 1000.0
+        self.R[self.valid_actions] = -0.1
+        previous = np.min(self.neighbor_index.successors(self.goal))
+        self.R[previous, self.neighbors[previous] == self.goal] = 1000.0
+
+    def best_action(self, state: int) -> int:
+        """
+        Get the greedy action for a state, ignoring actions blocked by walls.
+
+        Args:
+            state (int): Current state number.
+
+        Returns:
+            int: Action (neighbour table column) with the highest Q-value.
+        """
+        return int(self.Q[state].argmax())
+
+    def policy(self, goal: int = None) -> GreedyPolicy:
+        """
+        Get the greedy policy of the Q table, cached until the next training.
+
+        Args:
+            goal (int): Goal state number; only the goal the Q table was trained
+                for is supported (default: that goal).
+
+        Returns:
+            GreedyPolicy: The greedy policy.
+
+        Raises:
+            ValueError: If ``goal`` is not the goal of the Q table.
+        """
+        goal = self.goal if goal is None else int(goal)
+        if ("q", goal) not in self._policies:
+            if goal != self.goal:
+                raise ValueError(f"The Q table was trained for goal {self.goal}, not {goal}")
+            best = self.Q.argmax(axis=1)
+            next_states = self.neighbors[np.arange(self.n_states), best]
+            self._policies["q", goal] = GreedyPolicy(np.asarray(next_states), goal)
+        return self._policies["q", goal]
+
+    def query(self, starts, goal: int = None):
+        """
+        Find the greedy paths from many start states in one call.
+
+        Unlike ``walk``, queries neither print nor touch ``path``, and they reuse
+        the cached policy, so their cost only depends on the lengths of the paths.
+
+        Args:
+            starts (array-like): Start state numbers.
+            goal (int): Goal state number (default: the goal of the agent).
+
+        Returns:
+            tuple: A list with the path of every start and a boolean array telling
+            which paths reach the goal, see ``GreedyPolicy.rollout``.
+        """
+        return self.policy(goal).rollout(starts)
+
+    def greedy_path_length(self) -> int:
+        """
+        Follow the greedy policy from the start without recording the path.
+
+        Returns:
+            int: Number of moves needed to reach the goal, or -1 if the greedy
+            policy does not reach it within ``n_states`` moves.
+        """
+        current_state = self.start
+        for moves in range(self.n_states + 1):
+            if current_state == self.goal:
+                return moves
+            current_state = self.neighbors[current_state, self.best_action(current_state)]
+        return -1
 
-    def train(self, f_matrix: np.array, epochs: int):
+    def train(self, f_matrix: np.array = None, epochs: int = 1000, tol: float = 1e-3, patience: int = 5,
+              rng=None, observers=None, scheduler: str = "uniform", **scheduler_options):
         """
         Train the agent using Q-learning algorithm.
 
         The agent learns by repeatedly exploring the environment and updating
         Q-values using the Bellman equation. Each training episode starts from
-        a random state and continues until the goal is reached.
+        a random state and continues until the goal is reached. Successors are
+        looked up in a precomputed neighbour index, so the cost of a training
+        step does not depend on the size of the maze.
+
+        ``epochs`` is an upper bound: training stops early once it has converged,
+        i.e. for ``patience`` consecutive epochs the greedy path from the start
+        reached the goal with an unchanged length and the largest Q-value change
+        of the epoch stayed within ``tol`` relative to the largest Q-value.
+
+        All random choices come from ``rng``, so training twice from the same
+        seed gives bit-identical Q tables.
+
+        ``observers`` (see ``instrument.TrainingObserver``) are notified at the
+        start and end of training and after every episode. Per-step timing and
+        step tracing only run when an observer asks for them, so training
+        without observers pays a single flag check per step.
+
+        ``scheduler`` selects which Q-values are updated: "uniform" updates the
+        steps of uniform random exploration as they are taken, "replay" also
+        replays past transitions (see ``train_replay``) and "prioritized" updates
+        in order of Bellman error (see ``train_prioritized``). All of them share
+        the convergence test and the observers.
 
         Args:
-            f_matrix (np.array): Feasibility matrix indicating valid state transitions.
-            epochs (int): Number of training episodes to run.
+            f_matrix (np.array): Deprecated and ignored. Transitions are always
+                read from the neighbour index of the feasibility the agent was
+                built with; passing a matrix emits a ``DeprecationWarning``.
+            epochs (int): Maximum number of training episodes to run.
+            tol (float): Relative Q-value change under which an epoch counts as
+                converged, or None to always run all epochs (default: 1e-3).
+            patience (int): Number of consecutive converged epochs required to
+                stop early (default: 5).
+            rng (np.random.Generator): Source of randomness, or a seed for
+                ``np.random.default_rng`` (default: None, fresh entropy).
+            observers (list): Training observers to notify (default: None).
+            scheduler (str): Update scheduler, one of ``SCHEDULERS`` (default: "uniform").
+            **scheduler_options: Keyword arguments of ``train_replay`` or
+                ``train_prioritized``.
+
+        Returns:
+            int: Number of epochs actually run.
+
+        Raises:
+            ValueError: If ``scheduler`` is unknown.
         """
-        for _ in range(epochs):
+        if f_matrix is not None:
+            warnings.warn("Agent.train ignores f_matrix; transitions come from the agent's feasibility",
+                          DeprecationWarning, stacklevel=2)
+        if scheduler == "replay":
+            return self.train_replay(epochs, tol, patience, rng, observers, **scheduler_options)
+        if scheduler == "prioritized":
+            return self.train_prioritized(epochs, tol, patience, rng, observers, **scheduler_options)
+        if scheduler != "uniform":
+            raise ValueError(f"Unknown scheduler '{scheduler}', expected one of {SCHEDULERS}")
+        if scheduler_options:
+            raise TypeError(f"Unexpected options for the uniform scheduler: {sorted(scheduler_options)}")
+        observers = list(observers or ())
+        timed = any(observer.timed for observer in observers)
+        trace_every = min((observer.trace_every for observer in observers if observer.trace_every),
+                          default=0)
+        instrumented = timed or trace_every > 0
+        lookup_time = update_time = 0.0
+        rng = np.random.default_rng(rng)
+        draws, used = rng.random(DRAW_BLOCK).tolist(), 0
+        indptr = self.neighbor_index.indptr
+        indices = self.neighbor_index.indices
+        actions = self.neighbor_index.actions
+        q_table, r_table = self.Q, self.R
+        self.converged = False
+        convergence = _Convergence(self, tol, patience)
+        steps = 0
+        for observer in observers:
+            observer.on_train_start(self, epochs)
+
+        for self.epochs_trained in range(1, epochs + 1):
             # Select random initial state for exploration
-            current_state = np.random.randint(0, self.n_states)
+            if used == DRAW_BLOCK:
+                draws, used = rng.random(DRAW_BLOCK).tolist(), 0
+            current_state = int(draws[used] * self.n_states)
+            used += 1
+            max_delta = 0.0
+            episode_start = steps
 
             while True:
-                # Choose next state randomly from valid options
-                next_state: int = get_random_next_state(
-                    current_state, f_matrix, self.n_states)
+                if instrumented:
+                    step_started = perf_counter()
+                # Choose a random valid action and the state it leads to
+                if used == DRAW_BLOCK:
+                    draws, used = rng.random(DRAW_BLOCK).tolist(), 0
+                first = indptr[current_state]
+                position = first + int(draws[used] * (indptr[current_state + 1] - first))
+                used += 1
+                action: int = actions[position]
+                next_state: int = indices[position]
 
                 # Find the maximum Q-value for the next state (for Bellman equation)
-                max_q: float = -99999.9
-                for next_next_state in get_possible_next_states(next_state, f_matrix, self.n_states):
-                    max_q = max(max_q, float(
-                        self.Q[next_state][next_next_state]))
+                max_q: float = float(q_table[next_state, actions[
+                    indptr[next_state]:indptr[next_state + 1]]].max())
+                if instrumented:
+                    looked_up = perf_counter()
 
                 # Update Q-value using Bellman equation:
                 # Q(s,a) = (1-α)Q(s,a) + α[R(s,a) + γ·max(Q(s',a'))]
-                self.Q[current_state][next_state] = (1 - self.lrn_rate) * self.Q[current_state][next_state] + (
-                    self.lrn_rate * (self.R[current_state][next_state] + self.gamma * max_q))
+                old_q = q_table[current_state, action]
+                q_table[current_state, action] = (1 - self.lrn_rate) * old_q + (
+                    self.lrn_rate * (r_table[current_state, action] + self.gamma * max_q))
+                max_delta = max(max_delta, abs(float(q_table[current_state, action] - old_q)))
+                steps += 1
+                if instrumented:
+                    lookup_time += looked_up - step_started
+                    update_time += perf_counter() - looked_up
+                    if trace_every and steps % trace_every == 0:
+                        for observer in observers:
+                            observer.on_step(self, self.epochs_trained, current_state, action, next_state,
+                                             float(q_table[current_state, action] - old_q))
 
                 current_state = next_state
                 if current_state == self.goal:
                     break
 
-    def walk(self, maze, feasibility: Feasibility):
+            for observer in observers:
+                observer.on_episode_end(self, self.epochs_trained, steps - episode_start, max_delta,
+                                        lookup_time, update_time)
+
+            if convergence.update(max_delta):
+                self.converged = True
+                break
+
+        self.steps_trained = steps
+        self._policies = {}
+        for observer in observers:
+            observer.on_train_end(self)
+        return self.epochs_trained
+
+    def train_batched(self, epochs: int, n_walkers: int = 64, collision: str = "last", rng=None):
+        """
+        Train the agent with many Q-learning episodes running in lockstep.
+
+        Instead of following one walker at a time, an array of ``n_walkers``
+        concurrent walkers is advanced with NumPy operations: every walker picks a
+        random valid action, the Bellman targets for all of them are computed
+        at once and written back into the Q table. A walker that reaches the goal
+        completes an episode and is respawned in place at a random state.
+
+        Several walkers may update the same (state, action) pair in one step.
+        ``collision`` selects how those updates are combined:
+        - "last": the update of the walker with the highest index wins
+        - "mean": the targets of all colliding walkers are averaged
+
+        Args:
+            epochs (int): Number of training episodes to complete.
+            n_walkers (int): Number of concurrent walkers (default: 64).
+            collision (str): Rule for colliding updates, "last" or "mean" (default: "last").
+            rng (np.random.Generator): Source of randomness, or a seed for
+                ``np.random.default_rng`` (default: None, fresh entropy).
+        """
+        if collision not in COLLISION_RULES:
+            raise ValueError(
+                f"Unknown collision rule '{collision}', expected one of {COLLISION_RULES}")
+
+        indptr = self.neighbor_index.indptr
+        indices = self.neighbor_index.indices
+        actions = self.neighbor_index.actions
+        degrees = np.diff(indptr)
+
+        rng = np.random.default_rng(rng)
+        states = rng.integers(0, self.n_states, size=n_walkers)
+        completed = 0
+        while completed < epochs:
+            # Choose a random valid action for every walker
+            positions = indptr[states] + (
+                rng.random(n_walkers) * degrees[states]).astype(np.int64)
+            chosen = actions[positions]
+            next_states = indices[positions]
+
+            self._batch_update(states, chosen, self.R[states, chosen], next_states, collision)
+
+            # Respawn walkers that reached the goal
+            states = next_states
+            finished = states == self.goal
+            n_finished = int(finished.sum())
+            if n_finished:
+                completed += n_finished
+                states[finished] = rng.integers(0, self.n_states, size=n_finished)
+        self._policies = {}
+
+    def train_replay(self, epochs: int = 1000, tol: float = 1e-3, patience: int = 5, rng=None,
+                     observers=None, buffer_size: int = 65536, batch_size: int = 256,
+                     replay_ratio: float = 8.0):
+        """
+        Train the agent with experience replay.
+
+        Every episode explores like ``train``, updating the Q-values of the steps
+        it takes and storing them in a ``ReplayBuffer``. After the episode,
+        ``replay_ratio`` times as many stored transitions as the episode took
+        steps are drawn uniformly and updated in batches of ``batch_size`` with
+        NumPy operations, so the reward found at the goal spreads back along old
+        paths without walking them again, and the replay effort follows the
+        length of the episodes. Colliding updates within a batch follow the
+        "last" rule of ``train_batched``.
+
+        Training stops early like ``train``; the observers are notified of every
+        episode, without step timing or tracing.
+
+        Args:
+            epochs (int): Maximum number of training episodes to run.
+            tol (float): Relative Q-value change under which an epoch counts as
+                converged, or None to always run all epochs (default: 1e-3).
+            patience (int): Number of consecutive converged epochs required to
+                stop early (default: 5).
+            rng (np.random.Generator): Source of randomness, or a seed for
+                ``np.random.default_rng`` (default: None, fresh entropy).
+            observers (list): Training observers to notify (default: None).
+            buffer_size (int): Capacity of the replay buffer (default: 65536).
+            batch_size (int): Transitions per replayed batch (default: 256).
+            replay_ratio (float): Transitions replayed after every episode per
+                step of the episode (default: 8.0).
+
+        Returns:
+            int: Number of epochs actually run.
+        """
+        observers = list(observers or ())
+        rng = np.random.default_rng(rng)
+        buffer = ReplayBuffer(buffer_size)
+        q_table, r_table = self.Q, self.R
+        self.converged = False
+        convergence = _Convergence(self, tol, patience)
+        steps = 0
+        for observer in observers:
+            observer.on_train_start(self, epochs)
+
+        for self.epochs_trained in range(1, epochs + 1):
+            max_delta = 0.0
+            episode_start = steps
+            for state, action, next_state in self._random_episode(rng):
+                reward = r_table[state, action]
+                old_q = q_table[state, action]
+                q_table[state, action] = (1 - self.lrn_rate) * old_q + self.lrn_rate * (
+                    reward + self.gamma * self._max_q(next_state))
+                max_delta = max(max_delta, abs(float(q_table[state, action] - old_q)))
+                buffer.add(state, action, reward, next_state)
+                steps += 1
+
+            replays = int(np.ceil(replay_ratio * (steps - episode_start)))
+            for start in range(0, replays, batch_size):
+                size = min(batch_size, replays - start)
+                delta = self._batch_update(*buffer.sample(size, rng), collision="last")
+                max_delta = max(max_delta, delta)
+                steps += size
+
+            for observer in observers:
+                observer.on_episode_end(self, self.epochs_trained, steps - episode_start, max_delta, 0.0, 0.0)
+            if convergence.update(max_delta):
+                self.converged = True
+                break
+
+        self.steps_trained = steps
+        self._policies = {}
+        for observer in observers:
+            observer.on_train_end(self)
+        return self.epochs_trained
+
+    def train_prioritized(self, epochs: int = 1000, tol: float = 1e-3, patience: int = 5, rng=None,
+                          observers=None, planning_steps: int = None, theta: float = 1e-12):
+        """
+        Train the agent with prioritized sweeping.
+
+        (state, action) pairs are kept in a priority queue ordered by their
+        Bellman error, the change an update would make to their Q-value. The
+        queue starts with the moves into the goal. Every episode explores like
+        ``train``, queueing the pairs it visits instead of updating them, then
+        makes up to ``planning_steps`` updates, each time taking the pair with
+        the largest error and queueing the predecessors of its state, whose
+        targets have just changed. Updates therefore sweep backwards from the
+        goal through the predecessors and are only spent where values change.
+
+        Training stops early like ``train``; the observers are notified of every
+        episode, without step timing or tracing.
+
+        Args:
+            epochs (int): Maximum number of training episodes to run.
+            tol (float): Relative Q-value change under which an epoch counts as
+                converged, or None to always run all epochs (default: 1e-3).
+            patience (int): Number of consecutive converged epochs required to
+                stop early (default: 5).
+            rng (np.random.Generator): Source of randomness, or a seed for
+                ``np.random.default_rng`` (default: None, fresh entropy).
+            observers (list): Training observers to notify (default: None).
+            planning_steps (int): Maximum number of queued updates made after
+                every episode (default: 16 per valid (state, action) pair).
+            theta (float): Bellman error, relative to the largest reward, under
+                which a pair is not queued (default: 1e-12). Pairs whose update
+                would not change their stored Q-value are never queued.
+
+        Returns:
+            int: Number of epochs actually run.
+        """
+        observers = list(observers or ())
+        rng = np.random.default_rng(rng)
+        if planning_steps is None:
+            # Values settle along long corridors in a few episodes at this budget
+            planning_steps = 16 * int(self.valid_actions.sum())
+        # Values far from the goal differ by tiny amounts, so the cutoff scales with the rewards
+        threshold = theta * float(np.abs(self.R).max())
+        q_type = self.Q.dtype.type
+        pred_indptr, pred_states, pred_actions = self._predecessors()
+        # Priority each pair is queued with, 0.0 when it is not queued
+        queued = np.zeros(self.Q.shape, dtype=np.float64)
+        queue = []
+
+        def bellman_error(state, action):
+            old_q = float(self.Q[state, action])
+            return old_q, float(self.R[state, action]) + self.gamma * self._max_q(self.neighbors[state, action]) - old_q
+
+        def push(state, action):
+            old_q, error = bellman_error(state, action)
+            priority = abs(error)
+            if (priority > threshold and priority > queued[state, action]
+                    and q_type(old_q + self.lrn_rate * error) != q_type(old_q)):
+                queued[state, action] = priority
+                heapq.heappush(queue, (-priority, state, action))
+
+        def push_predecessors(state):
+            for position in range(pred_indptr[state], pred_indptr[state + 1]):
+                if pred_states[position] != self.goal:
+                    push(pred_states[position], pred_actions[position])
+
+        self.converged = False
+        convergence = _Convergence(self, tol, patience)
+        steps = 0
+        push_predecessors(self.goal)
+        for observer in observers:
+            observer.on_train_start(self, epochs)
+
+        for self.epochs_trained in range(1, epochs + 1):
+            for state, action, _ in self._random_episode(rng):
+                push(state, action)
+
+            max_delta = 0.0
+            episode_start = steps
+            while queue and steps - episode_start < planning_steps:
+                priority, state, action = heapq.heappop(queue)
+                if -priority != queued[state, action]:
+                    continue  # superseded by a later push with a higher priority
+                queued[state, action] = 0.0
+                # Same rounding as the check in push, so every queued update changes Q
+                old_q, error = bellman_error(state, action)
+                self.Q[state, action] = old_q + self.lrn_rate * error
+                max_delta = max(max_delta, abs(float(self.Q[state, action]) - old_q))
+                steps += 1
+                push(state, action)
+                push_predecessors(state)
+
+            for observer in observers:
+                observer.on_episode_end(self, self.epochs_trained, steps - episode_start, max_delta, 0.0, 0.0)
+            if convergence.update(max_delta):
+                self.converged = True
+                break
+
+        self.steps_trained = steps
+        self._policies = {}
+        for observer in observers:
+            observer.on_train_end(self)
+        return self.epochs_trained
+
+    def _random_episode(self, rng):
+        """Yield the (state, action, next_state) steps of a uniform random walk to the goal."""
+        indptr = self.neighbor_index.indptr
+        indices = self.neighbor_index.indices
+        actions = self.neighbor_index.actions
+        draws, used = rng.random(DRAW_BLOCK).tolist(), 0
+        state = int(draws[0] * self.n_states)
+        used += 1
+        while state != self.goal:
+            if used == DRAW_BLOCK:
+                draws, used = rng.random(DRAW_BLOCK).tolist(), 0
+            first = indptr[state]
+            position = first + int(draws[used] * (indptr[state + 1] - first))
+            used += 1
+            next_state = int(indices[position])
+            yield state, int(actions[position]), next_state
+            state = next_state
+
+    def _max_q(self, state) -> float:
+        """Maximum Q-value over the valid actions of a state."""
+        indptr = self.neighbor_index.indptr
+        return float(self.Q[state, self.neighbor_index.actions[indptr[state]:indptr[state + 1]]].max())
+
+    def _predecessors(self):
+        """
+        Index the moves into every state, in CSR form.
+
+        Returns:
+            tuple: ``indptr``, ``states`` and ``actions`` arrays, the moves into
+            state ``s`` being ``states[indptr[s]:indptr[s + 1]]`` taking
+            ``actions[indptr[s]:indptr[s + 1]]``.
+        """
+        index = self.neighbor_index
+        sources = np.repeat(np.arange(self.n_states, dtype=np.int64), np.diff(index.indptr))
+        order = np.argsort(index.indices, kind="stable")
+        counts = np.bincount(index.indices, minlength=self.n_states)
+        indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return indptr, sources[order], np.asarray(index.actions)[order]
+
+    def _batch_update(self, states, chosen, rewards, next_states, collision: str) -> float:
+        """
+        Apply the Bellman updates of many transitions at once.
+
+        Args:
+            states (np.ndarray): States the transitions start from.
+            chosen (np.ndarray): Actions taken.
+            rewards (np.ndarray): Rewards received.
+            next_states (np.ndarray): States the actions led to.
+            collision (str): Rule for colliding updates, see ``train_batched``.
+
+        Returns:
+            float: Largest Q-value change.
+        """
+        # Maximum Q-value over the valid actions of every next state
+        max_q = self.Q[next_states].max(axis=1)
+
+        # Bellman targets for all transitions at once
+        old_q = self.Q[states, chosen]
+        targets = (1 - self.lrn_rate) * old_q + self.lrn_rate * (rewards + self.gamma * max_q)
+        keys = states * self.Q.shape[1] + chosen
+        if collision == "last":
+            unique_keys, reversed_first = np.unique(keys[::-1], return_index=True)
+            self.Q.flat[unique_keys] = targets[len(keys) - 1 - reversed_first]
+        else:
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            self.Q.flat[unique_keys] = (np.bincount(inverse, weights=targets)
+                                        / np.bincount(inverse))
+        return float(np.abs(targets - old_q).max(initial=0.0))
+
+    def save(self, filename):
+        """
+        Write the Q and R tables and the hyperparameters to an uncompressed ``.npz`` file.
+
+        The connectivity is not included; save the feasibility separately.
+
+        Args:
+            filename (str): Path or open binary file to write.
+        """
+        np.savez(filename, Q=self.Q, R=self.R, gamma=self.gamma, lrn_rate=self.lrn_rate,
+                 start=self.start, goal=self.goal, epochs_trained=self.epochs_trained,
+                 steps_trained=self.steps_trained, converged=self.converged)
+
+    @classmethod
+    def load(cls, filename, feasibility: Feasibility):
+        """
+        Read an agent written by ``save``.
+
+        Args:
+            filename (str): Path or open binary file to read.
+            feasibility (Feasibility): Connectivity of the maze the agent was trained on.
+
+        Returns:
+            Agent: The agent, ready to ``walk`` without training.
+        """
+        agent = cls.__new__(cls)
+        agent.neighbors = feasibility.neighbors
+        agent._bind(feasibility)
+        with np.load(filename) as data:
+            agent.Q, agent.R = data["Q"], data["R"]
+            agent.gamma, agent.lrn_rate = float(data["gamma"]), float(data["lrn_rate"])
+            agent.start, agent.goal = int(data["start"]), int(data["goal"])
+            agent.epochs_trained = int(data["epochs_trained"])
+            agent.steps_trained = int(data["steps_trained"])
+            agent.converged = bool(data["converged"])
+        if agent.Q.shape != feasibility.neighbors.shape:
+            raise ValueError(f"Q table of shape {agent.Q.shape} does not match a maze with "
+                             f"{feasibility.cells} cells")
+        agent.path = []
+        agent._policies = {}
+        # Tables saved with zeros for blocked actions still load with -inf there
+        agent.Q[~agent.valid_actions] = -np.inf
+        agent.n_states = feasibility.cells
+        return agent
+
+    def walk(self, maze, feasibility: Feasibility, verbose: bool = False, max_steps: int = None,
+             record_path: bool = False) -> WalkResult:
         """
         Execute the learned policy to find a path from start to goal.
 
         Uses the trained Q-values to greedily select the best action at each
-        state, generating a path from the start to the goal position.
+        state and maps it back to the neighbouring state, generating a path
+        from the start to the goal position. States are written into a path
+        buffer allocated once per agent, and visit stamps (reset in O(1) by
+        moving to a new stamp) end the walk as soon as the policy returns to a
+        state it has already visited, so a walk costs only its length.
+
+        The returned ``WalkResult`` is the result of the walk; ``path`` is only
+        extended with ``record_path``, the legacy list format followed by
+        "break" if the goal was not reached.
 
         Args:
             maze (Maze): The maze object (used for compatibility).
             feasibility (Feasibility): Feasibility matrix object (used for compatibility).
+            verbose (bool): Whether to print the path once the walk ends (default: False).
+            max_steps (int): Maximum number of moves (default: ``n_states``, the
+                length bound of a simple path).
+            record_path (bool): Whether to also append the path to ``path`` (default: False).
+
+        Returns:
+            WalkResult: The path, whether it reached the goal and why the walk ended.
         """
-        current_state = self.start
-        self.path.append(current_state)
+        max_steps = self.n_states if max_steps is None else max_steps
+        if self._walk_path is None:
+            self._allocate_walk_buffers()
+        buffer = self._walk_path
+        visited = self._visit_stamps
+        self._walk_stamp += 1
+        stamp = self._walk_stamp
 
-        while current_state != self.goal:
-            print(str(current_state) + "->", end="")
+        current_state = self.start
+        buffer[0] = current_state
+        visited[current_state] = stamp
+        length, reason = 1, "max_steps"
+        while length <= max_steps:
+            if current_state == self.goal:
+                reason = "goal"
+                break
             # Select action with highest Q-value (greedy policy)
-            next_state = np.argmax(self.Q[current_state])
+            next_state = self.neighbors[current_state, self.best_action(current_state)]
 
-            # Check if agent is stuck (no progress possible)
-            if next_state == current_state:
-                self.path.append("break")
-                print("Path not found")
+            # Check if agent is stuck or going in circles
+            if next_state == NO_NEIGHBOR:
+                reason = "stuck"
+                break
+            if visited[next_state] == stamp:
+                reason = "loop"
                 break
 
-            self.path.append(next_state)
+            buffer[length] = next_state
+            visited[next_state] = stamp
+            length += 1
             current_state = next_state
+        else:
+            if current_state == self.goal:
+                reason = "goal"
+
+        result = WalkResult(buffer[:length].copy(), reason == "goal", reason)
+        if record_path:
+            self.path.extend(result.path.tolist())
+            if not result.success:
+                self.path.append("break")
+        if verbose:
+            print("->".join(map(str, result.path.tolist())))
+            print("Done" if result.success else f"Path not found ({reason})")
+        return result
+
+
+def compare_schedulers(feasibility: Feasibility, maze, schedulers=SCHEDULERS, trials: int = 5, seed: int = 0,
+                       gamma: float = 0.8, lrn_rate: float = 0.9, epochs: int = 1000, options=None):
+    """
+    Measure how many episodes every update scheduler needs to converge on a maze.
 
-        print("Done")
+    Trial ``i`` of every scheduler trains a fresh agent from the stream derived
+    from ``seed`` and ``i``, so all schedulers start from the same seeds.
+
+    Args:
+        feasibility (Feasibility): Connectivity of the maze.
+        maze (Maze): The maze, for its start and end.
+        schedulers (tuple): Names of the schedulers to compare (default: all ``SCHEDULERS``).
+        trials (int): Number of agents trained per scheduler (default: 5).
+        seed (int): Root seed of the comparison (default: 0).
+        gamma (float): Discount factor (default: 0.8).
+        lrn_rate (float): Learning rate (default: 0.9).
+        epochs (int): Maximum number of training epochs (default: 1000).
+        options (dict): Keyword arguments of ``Agent.train`` per scheduler name (default: None).
+
+    Returns:
+        list: One dict per scheduler with its ``scheduler`` name, the mean number
+        of ``episodes`` and Q-value updates (``steps``) run, the ``converged_rate``,
+        the ``success_rate`` of the greedy path from the start and the mean
+        ``train_time``.
+    """
+    options = options or {}
+    summary = []
+    for scheduler in schedulers:
+        episodes, steps, converged, succeeded, train_times = [], [], [], [], []
+        for trial in range(trials):
+            agent = Agent(feasibility, gamma=gamma, lrn_rate=lrn_rate, maze=maze,
+                          start_x=maze.start[0], start_y=maze.start[1])
+            started = perf_counter()
+            agent.train(epochs=epochs, rng=derive_seed(seed, trial), scheduler=scheduler,
+                        **options.get(scheduler, {}))
+            train_times.append(perf_counter() - started)
+            episodes.append(agent.epochs_trained)
+            steps.append(agent.steps_trained)
+            converged.append(agent.converged)
+            succeeded.append(agent.greedy_path_length() != -1)
+        summary.append({
+            "scheduler": scheduler,
+            "episodes": float(np.mean(episodes)),
+            "steps": float(np.mean(steps)),
+            "converged_rate": float(np.mean(converged)),
+            "success_rate": float(np.mean(succeeded)),
+            "train_time": float(np.mean(train_times)),
+        })
+    return summary
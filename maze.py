@@ -3,11 +3,22 @@ Maze generation module using recursive backtracking algorithm.
 
 This module implements maze generation using the recursive backtracking algorithm,
 which creates perfect mazes (mazes with exactly one path between any two points).
+Other algorithms from the ``generators`` registry can be selected instead.
+Walls are stored compactly as a bitmask per cell in a NumPy ``uint8`` array.
 """
 
-import random
+import hashlib
+import struct
+import time
 import numpy as np
-from cell import Cell
+from cell import Cell, WallView, ALL_WALLS
+from generators import GENERATORS, bfs_distances, eller_rows, get_generator
+
+# Maze file layout: magic, nx, ny, start x/y and end x/y, padded to the header size,
+# followed by the wall bitmasks one row (fixed y) after another
+MAZE_FILE_MAGIC = b"MAZEBITS"
+MAZE_FILE_HEADER = struct.Struct("<8s6q")
+MAZE_FILE_HEADER_SIZE = 64
 
 
 class Maze:
@@ -15,22 +26,36 @@ class Maze:
     Generates and manages maze structures using recursive backtracking.
 
     The Maze class creates a perfect maze where there is exactly one path between
-    any two points. It uses a recursive backtracking algorithm to carve passages
-    through a grid of cells.
+    any two points. By default it uses a recursive backtracking algorithm to carve
+    passages through a grid of cells; any algorithm registered in
+    ``generators.GENERATORS`` can be selected by name.
+
+    The walls of every cell are stored as a bitmask (see ``cell.WALL_BITS``) in
+    the ``walls`` array, so no per-cell Python objects are needed. ``cell_at``
+    and ``maze_grid`` still provide ``Cell`` objects for compatibility; they are
+    views whose walls read and write the bitmask.
 
     Attributes:
-        delta (dict): Direction vectors for movement (N, S, E, W).
+        delta (dict): Direction vectors for movement (N, S, W, E).
         nx (int): Width of the maze (number of columns).
         ny (int): Height of the maze (number of rows).
-        maze_grid (np.ndarray): 2D array of Cell objects representing the maze.
-        end (list): Coordinates [x, y] of the maze exit point.
+        walls (np.ndarray): 2D ``uint8`` array of wall bitmasks indexed by [x, y].
+        start (list): Coordinates [x, y] of the maze start point.
+        end (list): Coordinates [x, y] of the maze exit point, the cell farthest
+            from the start.
+        end_distance (int): Number of moves on the path from start to end, -1 if
+            unknown (for mazes opened from a file).
+        algorithm (str): Name of the generation algorithm used.
+        generation_time (float): Time spent generating the maze, in seconds.
+        filename (str): Path of the maze file the walls are mapped from, or None.
     """
     delta = {'N': (0, -1),
              'S': (0, 1),
              'W': (-1, 0),
              'E': (1, 0)}
+    opposite = {'N': 'S', 'S': 'N', 'W': 'E', 'E': 'W'}
 
-    def __init__(self, nx, ny, start_):
+    def __init__(self, nx, ny, start_, algorithm="backtracker", rng=None):
         """
         Initialize and generate a new maze.
 
@@ -38,12 +63,32 @@ class Maze:
             nx (int): Width of the maze (number of columns).
             ny (int): Height of the maze (number of rows).
             start_ (list): Starting coordinates [x, y] for maze generation.
+            algorithm (str): Name of the generation algorithm (default: "backtracker").
+            rng (np.random.Generator): Source of randomness, or a seed for
+                ``np.random.default_rng``; equal seeds give identical mazes
+                (default: None, fresh entropy).
         """
         self.end = None
+        self.end_distance = 0
+        self.algorithm = algorithm
+        self.filename = None
+        self.generation_time = 0.0
+        self.start = list(start_)
         self.nx, self.ny = nx, ny
-        self.maze_grid = np.array(
-            [[Cell(x, y) for y in range(ny)] for x in range(nx)])
-        self.__make_maze(start_)
+        self.walls = np.full((nx, ny), ALL_WALLS, dtype=np.uint8)
+        self._maze_grid = None
+        self.__make_maze(start_, np.random.default_rng(rng))
+
+    @property
+    def maze_grid(self):
+        """np.ndarray: 2D array of Cell views onto the wall bitmask, built on first use."""
+        if self._maze_grid is None:
+            maze_grid = np.empty((self.nx, self.ny), dtype=object)
+            for x in range(self.nx):
+                for y in range(self.ny):
+                    maze_grid[x, y] = self.cell_at(x, y)
+            self._maze_grid = maze_grid
+        return self._maze_grid
 
     def cell_at(self, x, y):
         """
@@ -54,9 +99,16 @@ class Maze:
             y (int): Y-coordinate of the cell.
 
         Returns:
-            Cell: The cell object at the given coordinates.
+            Cell: A cell view whose walls are backed by the maze bitmask.
         """
-        return self.maze_grid[x][y]
+        if self._maze_grid is not None:
+            return self._maze_grid[x, y]
+        cell = Cell(x, y, WallView(self.walls, x, y))
+        if [x, y] == self.start:
+            cell.status = 'Start'
+        elif [x, y] == self.end:
+            cell.status = 'End'
+        return cell
 
     def find_valid_neighbors(self, cell):
         """
@@ -75,56 +127,174 @@ class Maze:
         for direction, (dx, dy) in self.delta.items():
             neighbor_x, neighbor_y = cell.x + dx, cell.y + dy
             if (0 <= neighbor_x < self.nx) and (0 <= neighbor_y < self.ny):
-                neighbor = self.cell_at(neighbor_x, neighbor_y)
-                if neighbor.has_all_walls():
-                    neighbors.append((direction, neighbor))
+                if self.walls[neighbor_x, neighbor_y] == ALL_WALLS:
+                    neighbors.append((direction, self.cell_at(neighbor_x, neighbor_y)))
         return neighbors
 
-    def __make_maze(self, start_coords):
+    @classmethod
+    def open(cls, filename, mode="r"):
+        """
+        Open a maze file as a memory-mapped maze.
+
+        The walls are a ``numpy.memmap`` onto the file, so the grid is never read
+        into memory as a whole; only the parts that are accessed are paged in.
+
+        Args:
+            filename (str): Path of a file written by ``write_maze_file``.
+            mode (str): Memory-map mode, "r" (read-only) or "r+" (default: "r").
+
+        Returns:
+            Maze: The memory-mapped maze.
+        """
+        with open(filename, "rb") as file:
+            header = file.read(MAZE_FILE_HEADER.size)
+        magic, nx, ny, start_x, start_y, end_x, end_y = MAZE_FILE_HEADER.unpack(header)
+        if magic != MAZE_FILE_MAGIC:
+            raise ValueError(f"{filename} is not a maze file")
+
+        maze = cls.__new__(cls)
+        maze.nx, maze.ny = nx, ny
+        maze.start, maze.end = [start_x, start_y], [end_x, end_y]
+        maze.end_distance = -1
+        maze.algorithm = None
+        maze.filename = filename
+        maze.generation_time = 0.0
+        maze._maze_grid = None
+        rows = np.memmap(filename, dtype=np.uint8, mode=mode,
+                         offset=MAZE_FILE_HEADER_SIZE, shape=(ny, nx))
+        maze.walls = rows.T
+        return maze
+
+    def to_file(self, filename):
+        """
+        Write the maze to a file that can be reopened with ``Maze.open``.
+
+        Args:
+            filename (str): Path of the file to write.
         """
-        Generate the maze using recursive backtracking algorithm.
+        write_maze_file(filename, self.nx, self.ny, (self.walls[:, y] for y in range(self.ny)),
+                        self.start, self.end)
 
-        This private method implements the recursive backtracking algorithm to create
-        a perfect maze. It ensures that the start and end points are different by
-        regenerating the maze if they coincide.
+    def content_hash(self, chunk_rows=1024):
+        """
+        Hash the maze layout: size, start, end and every wall.
 
-        The algorithm works by:
-        1. Starting from the given coordinates
-        2. Randomly selecting unvisited neighbors
-        3. Carving passages by removing walls
-        4. Backtracking when no unvisited neighbors are available
-        5. Continuing until all cells are visited
+        Mazes with equal layouts have equal hashes whether they live in memory or
+        are memory-mapped, so the hash can key caches of derived data.
+
+        Args:
+            chunk_rows (int): Number of rows hashed at a time (default: 1024).
+
+        Returns:
+            str: Hexadecimal SHA-256 digest.
+        """
+        digest = hashlib.sha256(MAZE_FILE_HEADER.pack(MAZE_FILE_MAGIC, self.nx, self.ny,
+                                                      *self.start, *self.end))
+        # Rows are hashed in file order (fixed y), as written by write_maze_file
+        for y in range(0, self.ny, chunk_rows):
+            digest.update(np.ascontiguousarray(self.walls[:, y:y + chunk_rows].T).tobytes())
+        return digest.hexdigest()
+
+    @property
+    def cells_per_sec(self):
+        """float: Generation throughput of this maze in cells per second."""
+        return self.nx * self.ny / max(self.generation_time, 1e-9)
+
+    def __make_maze(self, start_coords, rng):
+        """
+        Generate the maze with the selected algorithm and choose its end.
+
+        The end is the cell farthest from the start. Generators that know it from
+        their carve order (such as the backtracker) report it directly; for the
+        others it is found with a breadth-first search over the finished maze.
+        The end is only equal to the start for a 1x1 maze.
 
         Args:
             start_coords (list): Starting coordinates [x, y] for maze generation.
+            rng (np.random.Generator): Source of randomness.
         """
-        while True:
-            n = self.nx * self.ny
-            cell_stack = []
-            current_cell = self.cell_at(start_coords[0], start_coords[1])
-            current_cell.status = 'Start'
-            n_visited = 1
-
-            while n_visited < n:
-                neighbors = self.find_valid_neighbors(current_cell)
-
-                if not neighbors:
-                    # Backtrack to previous cell
-                    current_cell = cell_stack.pop()
-                    continue
-
-                # Choose random neighbor and carve passage
-                direction, next_cell = random.choice(neighbors)
-                current_cell.knock_down_wall(next_cell, direction)
-                cell_stack.append(current_cell)
-                current_cell = next_cell
-                n_visited += 1
-
-                # Mark the last visited cell as the end
-                if n_visited == n:
-                    current_cell.status = 'End'
-                    self.end = [current_cell.x, current_cell.y]
-
-            # Ensure start and end are different points
-            if self.end != start_coords:
-                break
+        generator = get_generator(self.algorithm)
+        started = time.perf_counter()
+        self.walls, farthest, distance = generator(self.nx, self.ny, start_coords, rng)
+        if farthest is None:
+            distances = bfs_distances(self.walls, start_coords[0] * self.ny + start_coords[1])
+            farthest = int(np.argmax(distances))
+            distance = distances[farthest]
+        self.generation_time = time.perf_counter() - started
+        self.end = list(divmod(farthest, self.ny))
+        self.end_distance = int(distance)
+
+
+def write_maze_file(filename, nx, ny, rows, start_, end, chunk_rows=1024):
+    """
+    Write a maze file from an iterable of rows without holding the grid in memory.
+
+    Args:
+        filename (str): Path of the file to write.
+        nx (int): Width of the maze.
+        ny (int): Height of the maze.
+        rows (iterable): ``uint8`` wall bitmasks of every row (fixed y), indexed by x.
+        start_ (list): Start coordinates [x, y].
+        end (list): End coordinates [x, y].
+        chunk_rows (int): Number of rows buffered per write (default: 1024).
+    """
+    header = MAZE_FILE_HEADER.pack(MAZE_FILE_MAGIC, nx, ny, *start_, *end)
+    with open(filename, "wb") as file:
+        file.write(header.ljust(MAZE_FILE_HEADER_SIZE, b"\0"))
+        chunk = []
+        for row in rows:
+            chunk.append(np.asarray(row, dtype=np.uint8))
+            if len(chunk) == chunk_rows:
+                file.write(np.concatenate(chunk).tobytes())
+                chunk = []
+        if chunk:
+            file.write(np.concatenate(chunk).tobytes())
+
+
+def stream_maze(filename, nx, ny, start_=(0, 0), end=None, rng=None):
+    """
+    Generate a maze with Eller's algorithm straight into a maze file.
+
+    Rows are written as they are produced, so memory use is O(nx) and mazes
+    larger than RAM can be generated. Since no distances are computed, the
+    end defaults to the corner opposite the origin.
+
+    Args:
+        filename (str): Path of the file to write.
+        nx (int): Width of the maze.
+        ny (int): Height of the maze.
+        start_ (list): Start coordinates [x, y] (default: [0, 0]).
+        end (list): End coordinates [x, y] (default: [nx - 1, ny - 1]).
+        rng (np.random.Generator): Source of randomness, or a seed for
+            ``np.random.default_rng`` (default: None, fresh entropy).
+
+    Returns:
+        Maze: The generated maze, memory-mapped from the file.
+    """
+    if end is None:
+        end = [nx - 1, ny - 1]
+    write_maze_file(filename, nx, ny, eller_rows(nx, ny, rng), start_, end)
+    return Maze.open(filename)
+
+
+def benchmark_generators(nx, ny, algorithms=None, repeats=1):
+    """
+    Measure the throughput of maze generation algorithms.
+
+    Args:
+        nx (int): Width of the benchmark mazes.
+        ny (int): Height of the benchmark mazes.
+        algorithms (list): Names of the algorithms to measure (default: all registered).
+        repeats (int): Number of mazes generated per algorithm (default: 1).
+
+    Returns:
+        dict: Mapping of algorithm name to its best generation time in seconds
+        and the corresponding throughput in cells per second.
+    """
+    results = {}
+    for algorithm in algorithms or sorted(GENERATORS):
+        best = min((Maze(nx, ny, [0, 0], algorithm) for _ in range(repeats)),
+                   key=lambda maze: maze.generation_time)
+        results[algorithm] = {"seconds": best.generation_time,
+                              "cells_per_sec": best.cells_per_sec}
+    return results
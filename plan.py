@@ -0,0 +1,240 @@
+"""
+Exact planning module for maze solving.
+
+This module provides model-based alternatives to Q-learning. Since the maze
+connectivity and rewards are fully known, optimal values can be computed
+directly with synchronous value iteration, and the shortest start to goal
+path can be found with a breadth-first search over the maze graph. Both are
+useful to obtain paths quickly and to validate learned policies against
+ground truth.
+"""
+
+import numpy as np
+from convert import Feasibility, NO_NEIGHBOR
+from learn import Agent, GreedyPolicy
+
+
+class Planner(Agent):
+    """
+    Exact planner sharing the state, action and reward layout of the Agent.
+
+    The planner uses the same (n_states, 4) Q and R tables as ``Agent`` and the
+    rewards configured by ``Agent.set_rewards``, so its Q and V tables can be
+    compared directly with those of a trained agent. Paths are written to
+    ``path`` in the legacy list format of ``Agent.walk``.
+
+    ``shortest_path`` and ``distances_to`` only read the neighbour table and
+    write ``distances``; with a memory-mapped neighbour table and
+    ``distances_file`` they run on mazes larger than RAM, since the Q and R
+    tables are only allocated by the methods that use them.
+
+    Attributes:
+        V (np.ndarray): State values, the maximum Q-value over the valid actions.
+        distances (np.ndarray): Number of moves from every state to the goal,
+            filled by ``value_iteration`` and ``shortest_path`` (-1 for
+            unreachable states).
+        iterations (int): Number of sweeps performed by ``value_iteration``.
+    """
+
+    def __init__(self, feasibility: Feasibility, gamma: float, maze, start_x: int, start_y: int,
+                 distances_file=None):
+        """
+        Initialize the planner.
+
+        Args:
+            feasibility (Feasibility): Feasibility matrix object containing maze structure.
+            gamma (float): Discount factor for future rewards.
+            maze (Maze): Maze object containing start and end positions.
+            start_x (int): X-coordinate of the starting position.
+            start_y (int): Y-coordinate of the starting position.
+            distances_file (str): Optional ``.npy`` path to keep ``distances`` in a
+                memory-mapped file instead of in memory, for mazes opened with
+                ``Maze.open`` that are larger than RAM.
+        """
+        super().__init__(feasibility, gamma, 1.0, maze, start_x, start_y)
+        self._V = None
+        if distances_file is None:
+            self.distances: np.ndarray = np.full(self.n_states, -1, dtype=np.int64)
+        else:
+            self.distances = np.lib.format.open_memmap(
+                distances_file, mode="w+", dtype=np.int64, shape=(self.n_states,))
+            self.distances[:] = -1
+        self.iterations: int = 0
+
+    @property
+    def V(self) -> np.ndarray:
+        """np.ndarray: State values, zero until computed."""
+        if self._V is None:
+            self._V = np.zeros(self.n_states)
+        return self._V
+
+    @V.setter
+    def V(self, value: np.ndarray):
+        self._V = value
+
+    def value_iteration(self, tol: float = 1e-6, max_iterations: int = 100000):
+        """
+        Compute the optimal Q and V tables with synchronous value iteration.
+
+        Every sweep applies the Bellman optimality backup to all state-action
+        pairs at once:
+            Q(s,a) = R(s,a) + γ·max(Q(s',a'))
+        which is the fixed point the Q-learning updates of ``Agent.train``
+        converge to. A sweep carries the goal reward one move further, and
+        values far from the goal differ by tiny amounts, so iteration stops only
+        once every state has been reached (at least as many sweeps as the
+        largest distance to the goal), the greedy policy is unchanged by a sweep
+        and no Q-value changes by more than ``tol``. Values are kept in float64.
+
+        Args:
+            tol (float): Convergence tolerance on the largest Q-value change (default: 1e-6).
+            max_iterations (int): Upper bound on the number of sweeps (default: 100000).
+
+        Returns:
+            int: Number of sweeps performed.
+        """
+        self.distances = self.distances_to(self.goal, out=self.distances)
+        min_iterations = int(self.distances.max())
+        rewards = np.where(self.valid_actions, self.R, -np.inf).astype(np.float64)
+        next_states = np.where(self.valid_actions, self.neighbors, 0)
+        values = np.zeros(self.n_states)
+        greedy = None
+
+        self.iterations = 0
+        for self.iterations in range(1, max_iterations + 1):
+            q = rewards + self.gamma * values[next_states]
+            new_values = q.max(axis=1)
+            delta = np.abs(new_values - values).max()
+            values = new_values
+            new_greedy = q.argmax(axis=1)
+            stable = greedy is not None and np.array_equal(new_greedy, greedy)
+            greedy = new_greedy
+            if self.iterations >= min_iterations and stable and delta <= tol:
+                break
+
+        self.Q = q
+        self.V = values
+        self._policies.pop(("q", self.goal), None)
+        return self.iterations
+
+    def q_from_distances(self):
+        """
+        Set a Q table whose greedy policy is the shortest-path policy, from one BFS.
+
+        Q(s,a) is minus the distance to the goal of the state the action leads
+        to. These are not discounted returns, so they cannot be compared with
+        the Q table of a trained agent, but unlike ``value_iteration`` they take
+        a single breadth-first search on any maze size.
+        """
+        self.distances = self.distances_to(self.goal, out=self.distances)
+        reached = self.distances[np.where(self.valid_actions, self.neighbors, 0)]
+        self.Q = np.where(reached >= 0, -reached, -self.n_states).astype(np.float64)
+        self.Q[~self.valid_actions] = -np.inf
+        self.V = self.Q.max(axis=1)
+        self._policies.pop(("q", self.goal), None)
+
+    def best_action(self, state: int) -> int:
+        """
+        Get the greedy action for a state, preferring the move closer to the goal among ties.
+
+        Far from the goal, discounting makes the values of neighbouring states
+        equal in floating point; ties are then broken with the distances computed
+        by ``value_iteration`` or ``shortest_path``.
+
+        Args:
+            state (int): Current state number.
+
+        Returns:
+            int: Action (neighbour table column) with the highest Q-value.
+        """
+        q = self.Q[state]
+        action = int(q.argmax())
+        if self.distances[self.goal] != 0:
+            return action
+        ties = np.flatnonzero(q == q[action])
+        if len(ties) > 1:
+            distances = self.distances[self.neighbors[state, ties]]
+            return int(ties[np.argmin(np.where(distances >= 0, distances, self.n_states))])
+        return action
+
+    def shortest_path(self):
+        """
+        Find the shortest path from start to goal with a breadth-first search.
+
+        Every move costs the same -0.1 reward and only the goal is rewarded, so
+        the path with the fewest moves is also the one with the highest return.
+        The search expands whole BFS levels at once from the goal, recording the
+        distance of every state, and the path is then read off by stepping to a
+        neighbour one move closer to the goal.
+
+        The resulting path is appended to ``path``; "break" is appended if the
+        goal cannot be reached from the start.
+        """
+        self.distances = self.distances_to(self.goal, out=self.distances)
+
+        current_state = self.start
+        self.path.append(current_state)
+        if self.distances[current_state] == -1:
+            self.path.append("break")
+            return
+        while current_state != self.goal:
+            successors = self.neighbors[current_state]
+            successors = successors[successors != NO_NEIGHBOR]
+            current_state = successors[
+                np.argmax(self.distances[successors] == self.distances[current_state] - 1)]
+            self.path.append(current_state)
+
+    def distances_to(self, goal: int, out: np.ndarray = None) -> np.ndarray:
+        """
+        Compute the number of moves from every state to a goal with a breadth-first search.
+
+        Only the current BFS level is held in memory besides the distances.
+
+        Args:
+            goal (int): Goal state number.
+            out (np.ndarray): Optional int64 array of ``n_states`` entries, such as
+                a memory map, to write the distances into (default: a new array).
+
+        Returns:
+            np.ndarray: Distance of every state, -1 for states that cannot reach the goal.
+        """
+        if out is None:
+            distances = np.full(self.n_states, -1, dtype=np.int64)
+        else:
+            distances = out
+            distances[:] = -1
+        distances[goal] = 0
+        frontier = np.array([goal], dtype=np.int64)
+        level = 0
+        while frontier.size:
+            level += 1
+            candidates = self.neighbors[frontier].ravel()
+            candidates = candidates[candidates != NO_NEIGHBOR]
+            candidates = np.unique(candidates[distances[candidates] == -1])
+            distances[candidates] = level
+            frontier = candidates
+        return distances
+
+    def policy(self, goal: int = None) -> GreedyPolicy:
+        """
+        Get the shortest-path policy toward any goal, cached per goal.
+
+        The policy moves every state to a neighbour one move closer to the goal,
+        so unlike ``Agent.policy`` it does not depend on the Q table and works
+        for goals other than the planner's own.
+
+        Args:
+            goal (int): Goal state number (default: the goal of the planner).
+
+        Returns:
+            GreedyPolicy: The shortest-path policy.
+        """
+        goal = self.goal if goal is None else int(goal)
+        if ("bfs", goal) not in self._policies:
+            distances = self.distances_to(goal)
+            closer = self.valid_actions & (distances[self.neighbors] == distances[:, None] - 1)
+            next_states = np.where(closer.any(axis=1),
+                                   self.neighbors[np.arange(self.n_states), np.argmax(closer, axis=1)],
+                                   NO_NEIGHBOR)
+            self._policies["bfs", goal] = GreedyPolicy(next_states, goal)
+        return self._policies["bfs", goal]
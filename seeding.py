@@ -0,0 +1,45 @@
+"""
+Reproducible random streams module.
+
+Every random component (``Maze``, the generators in ``generators``,
+``Agent.train``) takes an explicit ``numpy.random.Generator`` or seed. This
+module derives independent streams for parallel work from a single root seed
+with ``numpy.random.SeedSequence``, so a run is reproduced exactly by its root
+seed no matter how its tasks are spread across processes.
+"""
+
+import numpy as np
+
+
+def derive_seed(root_seed, *keys):
+    """
+    Derive the seed of a task from the root seed of a run.
+
+    The result equals the ``SeedSequence`` that ``SeedSequence(root_seed).spawn``
+    would hand out at the position given by ``keys``, but it can be computed
+    independently in any process.
+
+    Args:
+        root_seed (int): Root seed of the run.
+        *keys (int): Position of the task, e.g. its index in a batch.
+
+    Returns:
+        np.random.SeedSequence: Seed of the task, accepted by ``np.random.default_rng``.
+    """
+    return np.random.SeedSequence(root_seed, spawn_key=keys)
+
+
+def spawn_generators(seed, n):
+    """
+    Create independent random generators from one seed.
+
+    Args:
+        seed (int): Seed, or a ``SeedSequence`` such as one from ``derive_seed``.
+        n (int): Number of generators.
+
+    Returns:
+        list: ``n`` independent ``np.random.Generator`` objects.
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed.spawn(n)]
@@ -0,0 +1,204 @@
+"""
+Parallel hyperparameter sweep module.
+
+This module trains many ``Agent`` configurations (a grid of discount factors,
+learning rates and epoch budgets, each repeated over several seeds) against the
+same maze on a process pool. The connectivity arrays of the maze's
+``Feasibility`` are copied into shared memory once and every worker attaches to
+them, instead of receiving a pickled copy with every task.
+"""
+
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+
+import numpy as np
+
+from convert import Feasibility, NeighborIndex
+from learn import Agent
+from plan import Planner
+from seeding import derive_seed
+
+# Feasibility arrays placed in shared memory
+SHARED_ARRAYS = ("neighbors", "indptr", "indices", "actions")
+
+# Feasibility attached by the worker processes of sweep()
+_worker_feasibility = None
+
+
+class SharedFeasibility(Feasibility):
+    """
+    Sparse ``Feasibility`` whose connectivity is held in shared memory.
+
+    The neighbour table and its CSR successor index are copied into
+    ``multiprocessing.shared_memory`` blocks by ``create``; other processes
+    attach to the same blocks with ``attach`` and a picklable ``spec``. The dense
+    matrix is never built.
+
+    Attributes:
+        neighbors (np.ndarray): Neighbour table backed by shared memory.
+        neighbor_index (NeighborIndex): CSR successor index backed by shared memory.
+        spec (dict): Block names, shapes and data types needed to attach.
+    """
+
+    def __init__(self, blocks, spec):
+        """
+        Wrap shared memory blocks; use ``create`` or ``attach`` instead.
+
+        Args:
+            blocks (dict): Mapping of array name to its ``SharedMemory`` block.
+            spec (dict): Description of the blocks, see ``spec``.
+        """
+        self._blocks = blocks
+        self.spec = spec
+        arrays = {name: np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+                  for name, (_, shape, dtype) in spec["arrays"].items()}
+        self.nx, self.ny = spec["nx"], spec["ny"]
+        self.cells = self.nx * self.ny
+        self.F_matrix = None
+        self.neighbors = arrays["neighbors"]
+        self._neighbor_index = NeighborIndex(arrays["indptr"], arrays["indices"], arrays["actions"])
+        self._numbered_grid = None
+
+    @classmethod
+    def create(cls, feasibility, maze):
+        """
+        Copy the connectivity of a feasibility into new shared memory blocks.
+
+        Args:
+            feasibility (Feasibility): The feasibility to share.
+            maze (Maze): The maze the feasibility was built from.
+
+        Returns:
+            SharedFeasibility: The owner of the blocks, responsible for ``unlink``.
+        """
+        index = feasibility.neighbor_index
+        sources = {"neighbors": feasibility.neighbors, "indptr": index.indptr,
+                   "indices": index.indices, "actions": index.actions}
+        blocks, arrays = {}, {}
+        for name in SHARED_ARRAYS:
+            source = np.asarray(sources[name])
+            block = shared_memory.SharedMemory(create=True, size=max(source.nbytes, 1))
+            np.ndarray(source.shape, dtype=source.dtype, buffer=block.buf)[...] = source
+            blocks[name] = block
+            arrays[name] = (block.name, source.shape, source.dtype.str)
+        spec = {"nx": maze.nx, "ny": maze.ny, "arrays": arrays}
+        return cls(blocks, spec)
+
+    @classmethod
+    def attach(cls, spec):
+        """
+        Attach to shared memory blocks created by another process.
+
+        Args:
+            spec (dict): The ``spec`` of the creating ``SharedFeasibility``.
+
+        Returns:
+            SharedFeasibility: A view onto the shared blocks.
+        """
+        blocks = {name: shared_memory.SharedMemory(name=block_name)
+                  for name, (block_name, _, _) in spec["arrays"].items()}
+        return cls(blocks, spec)
+
+    def close(self):
+        """Detach from the shared memory blocks."""
+        self.neighbors = self._neighbor_index = None
+        for block in self._blocks.values():
+            block.close()
+
+    def unlink(self):
+        """Detach from and free the shared memory blocks; call once, from the creator."""
+        self.close()
+        for block in self._blocks.values():
+            block.unlink()
+
+
+def make_configs(gammas, lrn_rates, epochs):
+    """
+    Build the grid of configurations to sweep.
+
+    Args:
+        gammas (list): Discount factors.
+        lrn_rates (list): Learning rates.
+        epochs (list): Maximum numbers of training epochs.
+
+    Returns:
+        list: Configurations as (gamma, lrn_rate, epochs) tuples.
+    """
+    return list(itertools.product(gammas, lrn_rates, epochs))
+
+
+def sweep(maze, feasibility, configs, trials=5, seed=0, workers=None, chunksize=4):
+    """
+    Train every configuration ``trials`` times on a process pool and summarize.
+
+    Trial ``i`` of every configuration is trained from the stream derived from
+    ``seed`` and ``i``, so all configurations see the same random episodes and
+    the results are reproducible. A trial succeeds when the greedy policy of
+    the trained agent reaches the goal from the maze start.
+
+    Args:
+        maze (Maze): The maze to train on.
+        feasibility (Feasibility): Connectivity of the maze.
+        configs (list): Configurations as (gamma, lrn_rate, epochs) tuples.
+        trials (int): Number of agents trained per configuration (default: 5).
+        seed (int): Root seed of the sweep (default: 0).
+        workers (int): Number of worker processes (default: one per CPU).
+        chunksize (int): Number of trainings handed to a worker at a time (default: 4).
+
+    Returns:
+        list: One dict per configuration with its ``gamma``, ``lrn_rate`` and
+        ``epochs``, the ``success_rate``, the ``optimality`` (shortest path length
+        divided by the mean length of the successful paths, 1.0 being optimal,
+        NaN if no trial succeeded), the mean ``episodes`` run before convergence
+        or the epoch limit, the ``converged_rate`` and the mean ``train_time``.
+    """
+    planner = Planner(feasibility, gamma=0.8, maze=maze, start_x=maze.start[0], start_y=maze.start[1])
+    planner.shortest_path()
+    shortest = len(planner.path) - 1
+
+    tasks = [(config, derive_seed(seed, trial)) for config in configs for trial in range(trials)]
+    shared = SharedFeasibility.create(feasibility, maze)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.spec, maze.start, maze.end)) as executor:
+            results = list(executor.map(_train_task, tasks, chunksize=chunksize))
+    finally:
+        shared.unlink()
+
+    summary = []
+    for number, (gamma, lrn_rate, epochs) in enumerate(configs):
+        lengths, episodes, converged, train_times = np.array(
+            results[number * trials:(number + 1) * trials], dtype=np.float64).T
+        succeeded = lengths >= 0
+        summary.append({
+            "gamma": gamma,
+            "lrn_rate": lrn_rate,
+            "epochs": epochs,
+            "success_rate": float(succeeded.mean()),
+            "optimality": float(shortest / lengths[succeeded].mean()) if succeeded.any() else float("nan"),
+            "episodes": float(episodes.mean()),
+            "converged_rate": float(converged.mean()),
+            "train_time": float(train_times.mean()),
+        })
+    return summary
+
+
+def _init_worker(spec, start, end):
+    """Attach a worker process to the shared feasibility."""
+    global _worker_feasibility
+    _worker_feasibility = (SharedFeasibility.attach(spec), start, SimpleNamespace(end=end))
+
+
+def _train_task(task):
+    """Train one configuration with one seed in a worker process."""
+    (gamma, lrn_rate, epochs), seed = task
+    feasibility, start, maze = _worker_feasibility
+    agent = Agent(feasibility, gamma=gamma, lrn_rate=lrn_rate, maze=maze,
+                  start_x=start[0], start_y=start[1])
+    started = time.perf_counter()
+    agent.train(epochs=epochs, rng=seed)
+    train_time = time.perf_counter() - started
+    return agent.greedy_path_length(), agent.epochs_trained, agent.converged, train_time
@@ -3,10 +3,21 @@
 Test script to verify all functionality works correctly
 """
 
-from maze import Maze
-from convert import Feasibility
-from draw import draw_maze, make_movie
-from learn import Agent
+import os
+import tempfile
+from maze import Maze, benchmark_generators, stream_maze
+from generators import GENERATORS
+from convert import Feasibility, find_edges, find_reachable_neighbors
+from draw import draw_maze, make_movie, render_palette_maze, draw_agent, AGENT_INDEX, rasterize_maze
+from learn import Agent, GreedyPolicy, ReplayBuffer, SCHEDULERS, WalkResult, compare_schedulers
+from plan import Planner
+from tiles import TileRenderer
+from batch import make_tasks, run_batch
+from sweep import SharedFeasibility, make_configs, sweep
+from seeding import derive_seed, spawn_generators
+from benchmark import compare, load_results, run_benchmarks, save_results
+from instrument import TrainingObserver, TrainingStats, StepTrace, TrainingProfiler
+from cache import SolutionCache
 import pandas as pd
 
 def my_print(matrix):
@@ -24,6 +35,58 @@ def test_maze_creation():
     print(f"Start: [0, 0], End: {maze.end}")
     return maze
 
+def test_maze_bitmask():
+    """Test the wall bitmask is consistent and exposed through Cell views"""
+    print("\nTesting maze wall bitmask...")
+    maze = Maze(7, 5, [2, 3])
+    assert maze.walls.shape == (7, 5) and maze.walls.dtype.name == "uint8"
+    for x in range(maze.nx):
+        for y in range(maze.ny):
+            cell = maze.cell_at(x, y)
+            for direction, (dx, dy) in maze.delta.items():
+                if not cell.walls[direction]:
+                    neighbor = maze.cell_at(x + dx, y + dy)
+                    assert not neighbor.walls[maze.opposite[direction]]
+    assert maze.maze_grid[2, 3].status == 'Start'
+    assert maze.maze_grid[maze.end[0], maze.end[1]].status == 'End'
+    # A perfect maze is a spanning tree: exactly nx * ny - 1 passages
+    assert int(Feasibility(maze).F_matrix.sum()) == 2 * (maze.nx * maze.ny - 1)
+    print(f"Wall bitmask:\n{maze.walls.T}")
+
+def test_generators():
+    """Test every registered algorithm builds a perfect maze with the farthest end"""
+    print("\nTesting maze generation algorithms...")
+    for algorithm in GENERATORS:
+        maze = Maze(9, 6, [0, 0], algorithm)
+        feasibility = Feasibility(maze)
+        assert int(feasibility.F_matrix.sum()) == 2 * (maze.nx * maze.ny - 1)
+        planner = Planner(feasibility, gamma=0.8, maze=maze, start_x=0, start_y=0)
+        planner.shortest_path()
+        assert (planner.distances >= 0).all()
+        assert planner.distances[planner.start] == maze.end_distance
+    for algorithm, result in benchmark_generators(30, 30).items():
+        print(f"{algorithm}: {result['cells_per_sec']:.0f} cells/sec")
+
+def test_maze_files():
+    """Test streamed and saved mazes reopen as memory-mapped mazes"""
+    print("\nTesting maze files...")
+    with tempfile.TemporaryDirectory() as directory:
+        streamed = stream_maze(os.path.join(directory, "streamed.maze"), 15, 10)
+        feasibility = Feasibility(streamed, dense=False,
+                                  neighbors_file=os.path.join(directory, "neighbors.npy"))
+        assert int((feasibility.neighbors != -1).sum()) == 2 * (15 * 10 - 1)
+        planner = Planner(feasibility, gamma=0.8, maze=streamed, start_x=0, start_y=0)
+        planner.shortest_path()
+        assert planner.path[-1] == planner.goal
+
+        maze = Maze(6, 9, [1, 2])
+        maze.to_file(os.path.join(directory, "saved.maze"))
+        reopened = Maze.open(os.path.join(directory, "saved.maze"))
+        assert (reopened.walls == maze.walls).all()
+        assert reopened.start == maze.start and reopened.end == maze.end
+        del feasibility, planner, streamed, reopened
+    print("Maze files written and reopened")
+
 def test_feasibility_matrix(maze):
     """Test feasibility matrix creation"""
     print("\nTesting feasibility matrix...")
@@ -32,6 +95,28 @@ def test_feasibility_matrix(maze):
     print(f"Number of cells: {feasibility.cells}")
     return feasibility
 
+def test_sparse_feasibility():
+    """Test sparse feasibility matches the dense matrix and trains an agent"""
+    print("\nTesting sparse feasibility...")
+    maze = Maze(6, 4, [0, 0])
+    dense = Feasibility(maze)
+    sparse = Feasibility(maze, dense=False)
+    assert sparse.F_matrix is None
+    assert sparse.neighbors.shape == (24, 4)
+    assert (sparse.to_dense() == dense.F_matrix).all()
+    for state in range(sparse.cells):
+        expected = sorted(dense.F_matrix[state].nonzero()[0])
+        assert sorted(sparse.successors(state)) == expected
+
+    agent = Agent(sparse, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=0, start_y=0)
+    agent.train(epochs=100)
+    import warnings
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        agent.train(dense.F_matrix, epochs=1)
+    assert [warning.category for warning in caught] == [DeprecationWarning]
+    print(f"Sparse neighbour table shape: {sparse.neighbors.shape}")
+
 def test_agent_training(maze, feasibility):
     """Test agent training"""
     print("\nTesting agent training...")
@@ -44,10 +129,67 @@ def test_agent_training(maze, feasibility):
     
     # Test pathfinding
     print("\nTesting pathfinding...")
-    agent.walk(maze, feasibility)
+    agent.walk(maze, feasibility, record_path=True)
     print(f"Path found: {agent.path}")
     return agent
 
+def test_batched_training():
+    """Test batched training finds the path for both collision rules"""
+    print("\nTesting batched training...")
+    maze = Maze(5, 5, [0, 0])
+    feasibility = Feasibility(maze, dense=False)
+    for collision in ("last", "mean"):
+        agent = Agent(feasibility, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=0, start_y=0)
+        agent.train_batched(epochs=500, n_walkers=32, collision=collision)
+        result = agent.walk(maze, feasibility)
+        assert result.success and result.path[-1] == agent.goal
+        print(f"Batched path ({collision}): {result.path.tolist()}")
+
+def test_planner():
+    """Test value iteration and BFS agree on the optimal path"""
+    print("\nTesting exact planner...")
+    maze = Maze(8, 8, [0, 0])
+    feasibility = Feasibility(maze, dense=False)
+    planner = Planner(feasibility, gamma=0.8, maze=maze, start_x=0, start_y=0)
+    planner.value_iteration()
+    greedy_path = planner.walk(maze, feasibility).path.tolist()
+    planner.shortest_path()
+    assert planner.path == greedy_path
+    assert planner.distances[planner.start] == len(planner.path) - 1
+    assert planner.distances[planner.start] == maze.end_distance
+    print(f"Optimal path ({planner.iterations} sweeps): {planner.path}")
+
+    # Long paths need more sweeps than the Q-values take to settle numerically
+    for size, seed in ((15, 1), (30, 1)):
+        maze = Maze(size, size, [0, 0], rng=seed)
+        feasibility = Feasibility(maze, dense=False)
+        planner = Planner(feasibility, gamma=0.8, maze=maze, start_x=0, start_y=0)
+        planner.value_iteration()
+        assert maze.end_distance >= 100 and planner.iterations >= maze.end_distance
+        result = planner.walk(maze, feasibility)
+        assert result.reason == "goal" and len(result.path) - 1 == maze.end_distance
+        planner.q_from_distances()
+        assert planner.greedy_path_length() == maze.end_distance
+    # Within float64 resolution the greedy policy of the Q table alone is optimal
+    maze = Maze(15, 15, [0, 0], rng=1)
+    planner = Planner(Feasibility(maze, dense=False), gamma=0.8, maze=maze, start_x=0, start_y=0)
+    planner.value_iteration()
+    assert Agent.policy(planner).distances[planner.start] == maze.end_distance
+    print(f"Value iteration walks {maze.end_distance} moves optimally")
+
+def test_early_stopping():
+    """Test training stops early once the greedy path is optimal and stable"""
+    print("\nTesting early stopping...")
+    maze = Maze(6, 6, [0, 0])
+    feasibility = Feasibility(maze, dense=False)
+    planner = Planner(feasibility, gamma=0.8, maze=maze, start_x=0, start_y=0)
+    planner.shortest_path()
+    agent = Agent(feasibility, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=0, start_y=0)
+    epochs = agent.train(epochs=1000)
+    assert agent.converged and epochs < 1000
+    assert agent.greedy_path_length() == len(planner.path) - 1
+    print(f"Converged after {epochs} epochs")
+
 def test_visualization(maze, feasibility, agent):
     """Test visualization"""
     print("\nTesting visualization...")
@@ -66,13 +208,494 @@ def test_visualization(maze, feasibility, agent):
     else:
         print("Path not found, skipping animation")
 
+def test_rasterizer():
+    """Test the NumPy rasterizer draws the same passages as the maze"""
+    print("\nTesting NumPy rasterizer...")
+    maze = Maze(8, 5, [0, 0])
+    feasibility = Feasibility(maze)
+    compact = rasterize_maze(maze, side=1)
+    assert compact.shape == (2 * maze.ny + 1, 2 * maze.nx + 1, 3)
+    passages = 0
+    for x in range(maze.nx):
+        for y in range(maze.ny):
+            if x + 1 < maze.nx:
+                is_open = compact[2 * y + 1, 2 * x + 2].any()
+                assert is_open == bool(feasibility.F_matrix[x * maze.ny + y, (x + 1) * maze.ny + y])
+                passages += is_open
+            if y + 1 < maze.ny:
+                is_open = compact[2 * y + 2, 2 * x + 1].any()
+                assert is_open == bool(feasibility.F_matrix[x * maze.ny + y, x * maze.ny + y + 1])
+                passages += is_open
+    assert passages == maze.nx * maze.ny - 1
+    full = rasterize_maze(maze)
+    assert full.shape[:2] == (80 + 100 * maze.ny, 80 + 100 * maze.nx)
+    print(f"Rasterized {full.shape[1]}x{full.shape[0]} image")
+
+def test_streaming_movie():
+    """Test dirty-rectangle GIF frames composite to the full frames"""
+    print("\nTesting streaming movie...")
+    import numpy as np
+    from PIL import Image, ImageDraw
+    maze = Maze(4, 3, [0, 0])
+    feasibility = Feasibility(maze, dense=False)
+    planner = Planner(feasibility, gamma=0.8, maze=maze, start_x=0, start_y=0)
+    planner.shortest_path()
+    background = render_palette_maze(maze)
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "movie.gif")
+        make_movie(maze, feasibility, planner.path, filename)
+        with Image.open(filename) as movie:
+            assert movie.n_frames == len(planner.path)
+            for frame_number, state in enumerate(planner.path):
+                movie.seek(frame_number)
+                expected = background.copy()
+                draw_agent(maze.cell_at(*divmod(state, maze.ny)), ImageDraw.Draw(expected), AGENT_INDEX)
+                assert np.array_equal(np.array(movie.convert("RGB")), np.array(expected.convert("RGB")))
+    print(f"{len(planner.path)} frames streamed")
+
+def test_tiles():
+    """Test the tile pyramid matches the full rasterized maze"""
+    print("\nTesting tiled rendering...")
+    import numpy as np
+    from PIL import Image
+    maze = Maze(20, 15, [0, 0])
+    with tempfile.TemporaryDirectory() as directory:
+        tiles = TileRenderer(maze, directory, tile_size=64, side=8, wide=2)
+        assert tiles.tile_count(0) == (1, 1)
+        n_tiles = tiles.render_all(workers=2)
+        assert n_tiles == sum(np.prod(tiles.tile_count(level)) for level in range(tiles.max_level + 1))
+
+        # Stitch the full-resolution level and compare it with a single rasterization
+        columns, rows = tiles.tile_count(tiles.max_level)
+        stitched = np.zeros((rows * 64, columns * 64, 3), dtype=np.uint8)
+        for tx in range(columns):
+            for ty in range(rows):
+                with Image.open(tiles.tile_path(tiles.max_level, tx, ty)) as tile:
+                    stitched[ty * 64:(ty + 1) * 64, tx * 64:(tx + 1) * 64] = np.array(tile)
+        expected = rasterize_maze(maze, 8, border=2 + 4, thickness=0, wide=2, grid=False)
+        region = stitched[:tiles.height, :tiles.width]
+        walls = np.all(expected[:tiles.height, :tiles.width] == 0, axis=2)
+        assert np.array_equal(np.all(region == 0, axis=2), walls)
+
+        planner = Planner(Feasibility(maze, dense=False), gamma=0.8, maze=maze, start_x=0, start_y=0)
+        planner.shortest_path()
+        written = tiles.overlay_path(planner.path)
+        assert tiles.tile_path(0, 0, 0, overlay=True) in written
+        assert tiles.get_tile(0, 0, 0, overlay=True) == tiles.tile_path(0, 0, 0, overlay=True)
+    print(f"{n_tiles} tiles rendered, {len(written)} overlay tiles")
+
+def test_batch_pipeline():
+    """Test the parallel batch pipeline is reproducible and columnar"""
+    print("\nTesting batch pipeline...")
+    import numpy as np
+    tasks = make_tasks([(4, 4), (5, 3)], count=3, seed=7, epochs=500)
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "results.npz")
+        columns = run_batch(tasks, filename, workers=2, chunksize=2)
+        with np.load(filename) as saved:
+            assert np.array_equal(saved["paths"], columns["paths"])
+    assert columns["index"].tolist() == list(range(6))
+    assert columns["success"].all()
+    assert np.array_equal(columns["path_length"], columns["shortest_length"])
+    assert np.array_equal(np.diff(columns["path_offsets"]), columns["path_length"] + 1)
+    again = run_batch(tasks[::-1], workers=1)
+    assert np.array_equal(again["path_length"][::-1], columns["path_length"])
+    print(f"{len(tasks)} mazes solved in {columns['train_time'].sum():.2f}s of training")
+
+def test_sweep():
+    """Test the hyperparameter sweep over a shared feasibility"""
+    print("\nTesting hyperparameter sweep...")
+    import numpy as np
+    maze = Maze(5, 4, [0, 0])
+    feasibility = Feasibility(maze, dense=False)
+    shared = SharedFeasibility.create(feasibility, maze)
+    try:
+        attached = SharedFeasibility.attach(shared.spec)
+        assert np.array_equal(attached.neighbors, feasibility.neighbors)
+        assert np.array_equal(attached.successors(3), feasibility.successors(3))
+        attached.close()
+    finally:
+        shared.unlink()
+
+    configs = make_configs([0.5, 0.9], [0.9], [300])
+    summary = sweep(maze, feasibility, configs, trials=2, workers=2)
+    assert [(row["gamma"], row["lrn_rate"], row["epochs"]) for row in summary] == configs
+    for row in summary:
+        assert row["success_rate"] == 1.0 and row["optimality"] == 1.0
+        assert 0 < row["episodes"] <= 300
+    assert sweep(maze, feasibility, configs, trials=2, workers=1)[0]["episodes"] == summary[0]["episodes"]
+    print(f"{len(configs)} configurations swept")
+
+def test_seeding():
+    """Test equal seeds give identical mazes, Q tables and paths"""
+    print("\nTesting deterministic seeding...")
+    import numpy as np
+    from learn import get_random_next_state
+    for algorithm in GENERATORS:
+        first, second = Maze(9, 7, [2, 3], algorithm, rng=11), Maze(9, 7, [2, 3], algorithm, rng=11)
+        assert np.array_equal(first.walls, second.walls) and first.end == second.end
+
+    maze = Maze(5, 5, [0, 0], rng=3)
+    feasibility = Feasibility(maze)
+    agents, paths = [], []
+    for _ in range(2):
+        agent = Agent(feasibility, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=0, start_y=0)
+        agent.train(epochs=200, rng=np.random.default_rng(5))
+        paths.append(agent.walk(maze, feasibility).path)
+        agents.append(agent)
+    assert np.array_equal(agents[0].Q, agents[1].Q) and np.array_equal(paths[0], paths[1])
+    assert (get_random_next_state(0, feasibility.F_matrix, feasibility.cells, rng=9)
+            == get_random_next_state(0, feasibility.F_matrix, feasibility.cells, rng=9)
+            == get_random_next_state(0, feasibility, feasibility.cells, rng=9))
+
+    # Streams derived from a root seed are reproducible and independent
+    assert derive_seed(1, 4).spawn_key == np.random.SeedSequence(1).spawn(5)[4].spawn_key
+    first, second = spawn_generators(derive_seed(1, 4), 2)
+    assert first.random() != second.random()
+    assert spawn_generators(derive_seed(1, 4), 1)[0].random() == spawn_generators(derive_seed(1, 4), 1)[0].random()
+    print("Seeded runs are identical")
+
+def test_benchmark():
+    """Test the benchmark harness records results and detects regressions"""
+    print("\nTesting benchmark harness...")
+    results = run_benchmarks(["maze", "train", "walk"], sizes=[4, 6], repeats=1)
+    assert [(row["stage"], row["nx"]) for row in results] == [
+        ("maze", 4), ("maze", 6), ("train", 4), ("train", 6), ("walk", 4), ("walk", 6)]
+    for row in results:
+        assert row["seconds"] > 0 and row["tracemalloc_peak_mb"] > 0
+    assert all(row["epochs"] == 20 and "seconds_per_step" in row for row in results if row["stage"] == "train")
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "benchmark.json")
+        save_results(results, filename)
+        baseline = load_results(filename)
+    assert compare(results, baseline) == []
+    faster = [dict(row, seconds=row["seconds"] / 10) for row in baseline]
+    regressions = compare(results, faster, min_seconds=0)
+    assert {(row["stage"], row["metric"]) for row in regressions} >= {("train", "seconds")}
+    print(f"{len(results)} measurements, {len(regressions)} regressions against a faster baseline")
+
+def test_instrumentation():
+    """Test training observers see every episode and do not change training"""
+    print("\nTesting training instrumentation...")
+    import numpy as np
+    maze = Maze(5, 5, [0, 0], rng=2)
+    feasibility = Feasibility(maze, dense=False)
+    plain = Agent(feasibility, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=0, start_y=0)
+    plain.train(epochs=100, rng=4)
+
+    class EpisodeCounter(TrainingObserver):
+        def __init__(self):
+            self.calls = []
+
+        def on_train_start(self, agent, epochs):
+            self.calls.append("start")
+
+        def on_episode_end(self, agent, epoch, steps, max_delta, lookup_time, update_time):
+            self.calls.append(epoch)
+
+        def on_train_end(self, agent):
+            self.calls.append("end")
+
+    stats, trace, profiler, counter = TrainingStats(), StepTrace(every=10), TrainingProfiler(), EpisodeCounter()
+    agent = Agent(feasibility, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=0, start_y=0)
+    agent.train(epochs=100, rng=4, observers=[stats, trace, profiler, counter])
+    assert np.array_equal(agent.Q, plain.Q) and agent.epochs_trained == plain.epochs_trained
+
+    assert counter.calls == ["start"] + list(range(1, agent.epochs_trained + 1)) + ["end"]
+    summary = stats.summary()
+    assert summary["episodes"] == agent.epochs_trained and summary["steps"] == agent.steps_trained
+    assert summary["lookup_time"] > 0 and summary["update_time"] > 0
+    assert len(trace.records) == agent.steps_trained // 10
+    assert "greedy_path_length" in profiler.report()
+    print(f"{summary['steps']} updates at {summary['updates_per_sec']:.0f}/s")
+
+def test_persistence():
+    """Test saving and loading agents and feasibilities, and the solution cache"""
+    print("\nTesting persistence and cache...")
+    import time
+    import numpy as np
+    maze = Maze(6, 5, [0, 0], rng=8)
+    with tempfile.TemporaryDirectory() as directory:
+        # Mazes written to a file hash like the mazes they were written from
+        maze.to_file(os.path.join(directory, "maze.maze"))
+        assert Maze.open(os.path.join(directory, "maze.maze")).content_hash() == maze.content_hash()
+        assert Maze(6, 5, [0, 0], rng=9).content_hash() != maze.content_hash()
+
+        feasibility = Feasibility(maze, dense=False)
+        feasibility.save(os.path.join(directory, "feasibility.npz"))
+        loaded = Feasibility.load(os.path.join(directory, "feasibility.npz"), dense=True)
+        assert np.array_equal(loaded.neighbors, feasibility.neighbors)
+        assert np.array_equal(loaded.F_matrix, Feasibility(maze).F_matrix)
+
+        agent = Agent(feasibility, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=0, start_y=0)
+        agent.train(epochs=300, rng=1)
+        agent.save(os.path.join(directory, "agent.npz"))
+        restored = Agent.load(os.path.join(directory, "agent.npz"), loaded)
+        assert np.array_equal(restored.Q, agent.Q) and restored.goal == agent.goal
+        assert np.array_equal(restored.walk(maze, loaded).path, agent.walk(maze, feasibility).path)
+
+        cache = SolutionCache(os.path.join(directory, "cache"))
+        _, first = cache.solve(maze, epochs=300, seed=1)
+        _, second = cache.solve(maze, epochs=300, seed=1)
+        assert (cache.misses, cache.hits) == (2, 2)
+        assert np.array_equal(first.Q, agent.Q) and np.array_equal(second.Q, agent.Q)
+        cache.solve(maze, epochs=300, seed=2)
+        assert len(os.listdir(cache.directory)) == 3
+
+        # Least recently used entries are evicted first
+        time.sleep(0.01)
+        cache.solve(maze, epochs=300, seed=1)
+        cache.max_bytes = os.path.getsize(cache.path("agent", cache.agent_key(
+            maze.content_hash(), gamma=0.8, lrn_rate=0.9, epochs=300, seed=1, start=[0, 0])))
+        assert cache.evict() == 2
+        assert cache.solve(maze, epochs=300, seed=1)[1].epochs_trained == agent.epochs_trained
+    print("Agents and feasibilities reload identically")
+
+def test_state_conversion():
+    """Test conversion between state numbers and cell coordinates"""
+    print("\nTesting state conversion...")
+    import numpy as np
+    maze = Maze(7, 4, [0, 0])
+    feasibility = Feasibility(maze, dense=False)
+    x, y = np.meshgrid(np.arange(7), np.arange(4), indexing="ij")
+    states = feasibility.to_state(x, y)
+    assert np.array_equal(states, feasibility.numbered_grid)
+    assert np.array_equal(np.stack(feasibility.to_coords(states.ravel())), np.stack((x.ravel(), y.ravel())))
+    assert feasibility.to_state(3, 2) == feasibility.numbered_grid[3, 2]
+    assert feasibility.to_coords(int(feasibility.numbered_grid[5, 1])) == (5, 1)
+    agent = Agent(feasibility, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=2, start_y=3)
+    assert feasibility.to_coords(agent.start) == (2, 3)
+    assert list(feasibility.to_coords(agent.goal)) == maze.end
+    print("States and coordinates round-trip")
+
+def test_vectorized_feasibility():
+    """Test the vectorized connectivity matches the per-cell neighbours"""
+    print("\nTesting vectorized feasibility...")
+    import numpy as np
+    import convert
+    maze = Maze(9, 6, [4, 2], "kruskal")
+    sources, targets, actions = find_edges(maze.walls, maze.ny, maze.delta)
+    assert len(sources) == 2 * (maze.nx * maze.ny - 1)  # a perfect maze is a tree
+    edges = set(zip(sources.tolist(), targets.tolist()))
+    expected = {(cell.x * maze.ny + cell.y, neighbor.x * maze.ny + neighbor.y)
+                for cell in maze.maze_grid.ravel() for neighbor in find_reachable_neighbors(maze, cell)}
+    assert edges == expected
+    directions = list(maze.delta)
+    for source, target, action in zip(sources, targets, actions):
+        dx, dy = maze.delta[directions[action]]
+        assert target == source + dx * maze.ny + dy
+
+    # Building in row blocks, also from a memory-mapped maze file, gives the
+    # same table as building in one go
+    feasibility = Feasibility(maze)
+    with tempfile.TemporaryDirectory() as directory:
+        maze.to_file(os.path.join(directory, "edges.maze"))
+        opened = Maze.open(os.path.join(directory, "edges.maze"))
+        chunk_cells, convert.EDGE_CHUNK_CELLS = convert.EDGE_CHUNK_CELLS, 2 * maze.nx
+        try:
+            chunked = Feasibility(maze)
+            mapped = Feasibility(opened)
+        finally:
+            convert.EDGE_CHUNK_CELLS = chunk_cells
+        assert np.array_equal(mapped.neighbors, feasibility.neighbors)
+        assert np.array_equal(mapped.F_matrix, feasibility.F_matrix)
+        del opened
+    assert np.array_equal(chunked.neighbors, feasibility.neighbors)
+    assert np.array_equal(chunked.F_matrix, feasibility.F_matrix)
+    assert np.array_equal(feasibility.F_matrix, feasibility.F_matrix.T)
+    print(f"{len(edges)} directed edges")
+
+def test_queries():
+    """Test batched path queries for many starts and goals"""
+    print("\nTesting path queries...")
+    import numpy as np
+    maze = Maze(6, 5, [0, 0], rng=4)
+    feasibility = Feasibility(maze, dense=False)
+    planner = Planner(feasibility, gamma=0.8, maze=maze, start_x=0, start_y=0)
+    planner.value_iteration()
+    starts = np.arange(feasibility.cells)
+    paths, success = planner.query(starts)
+    assert success.all() and planner.path == []
+    distances = planner.distances_to(planner.goal)
+    for start, path in zip(starts, paths):
+        assert path[0] == start and path[-1] == planner.goal and len(path) == distances[start] + 1
+    assert planner.policy() is planner.policy()
+
+    # The greedy policy of the optimal Q table agrees with the shortest paths
+    fresh = Planner(feasibility, gamma=0.8, maze=maze, start_x=0, start_y=0)
+    fresh.value_iteration()
+    q_paths, q_success = Agent.policy(fresh).rollout(starts)
+    assert q_success.all()
+    assert all(np.array_equal(path, expected) for path, expected in zip(q_paths, paths))
+    # Q-table and shortest-path policies are cached separately
+    assert fresh.policy() is not Agent.policy(fresh)
+    assert fresh.policy().distances[fresh.start] == maze.end_distance
+
+    # Goal-conditioned policies are cached per goal
+    other_paths, other_success = planner.query([0, 7], goal=12)
+    assert other_success.all() and all(path[-1] == 12 for path in other_paths)
+    assert ("bfs", 12) in planner._policies
+
+    agent = Agent(feasibility, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=0, start_y=0)
+    try:
+        agent.query([0], goal=12)
+        assert False, "agents only answer queries for their own goal"
+    except ValueError:
+        pass
+
+    # Loops and dead ends are detected without walking forever
+    policy = GreedyPolicy(np.array([1, 0, 3, 3, -1]), goal=3)
+    loop_paths, loop_success = policy.rollout([0, 2, 4])
+    assert loop_success.tolist() == [False, True, False]
+    assert [path.tolist() for path in loop_paths] == [[0, 1], [2, 3], [4]]
+    print(f"{len(starts)} queries answered")
+
+def test_quiet_walk():
+    """Test walks are silent, bounded and detect loops"""
+    print("\nTesting quiet walk...")
+    import contextlib
+    import io
+    import numpy as np
+    maze = Maze(5, 4, [0, 0], rng=6)
+    feasibility = Feasibility(maze, dense=False)
+    planner = Planner(feasibility, gamma=0.8, maze=maze, start_x=0, start_y=0)
+    planner.value_iteration()
+    planner.shortest_path()
+    expected = list(planner.path)
+
+    planner.path = []
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = planner.walk(maze, feasibility)
+    assert output.getvalue() == ""
+    assert isinstance(result, WalkResult) and result.success and result.reason == "goal"
+    assert result.path.dtype == np.int64 and result.path.tolist() == expected
+    assert planner.path == []
+
+    buffer = planner._walk_path
+    bounded = planner.walk(maze, feasibility, max_steps=3, record_path=True)
+    assert (bounded.success, bounded.reason, len(bounded.path)) == (False, "max_steps", 4)
+    assert planner.path == bounded.path.tolist() + ["break"]
+    # Walks reuse the agent's buffers but return paths of their own
+    assert planner._walk_path is buffer and result.path.tolist() == expected
+
+    # Blocked actions hold -inf, so the greedy step is a plain argmax
+    assert np.all(planner.Q[~planner.valid_actions] == -np.inf)
+    assert all(planner.valid_actions[state, Agent.best_action(planner, state)]
+               for state in range(planner.n_states))
+
+    # A Q table sending the start and its neighbour back and forth is a loop
+    start = planner.start
+    neighbor = int(planner.neighbors[start][planner.valid_actions[start]][0])
+    planner.Q[planner.valid_actions] = 0
+    planner.Q[start, planner.neighbors[start] == neighbor] = 1
+    planner.Q[neighbor, planner.neighbors[neighbor] == start] = 1
+    looped = planner.walk(maze, feasibility)
+    assert (looped.success, looped.reason, looped.path.tolist()) == (False, "loop", [start, neighbor])
+    print(f"Walk of {len(result.path) - 1} moves, loop detected after {len(looped.path)} states")
+
+def test_update_schedulers():
+    """Test experience replay and prioritized sweeping training"""
+    print("\nTesting update schedulers...")
+    import numpy as np
+    # A goal 91 moves from the start, far enough that values near the start differ by ~1e-5
+    maze = Maze(12, 12, [0, 0], rng=1)
+    assert maze.end_distance > 80
+    feasibility = Feasibility(maze, dense=False)
+
+    buffer = ReplayBuffer(3)
+    for step in range(5):
+        buffer.add(step, step % 4, -0.1, step + 1)
+    assert buffer.size == 3 and sorted(buffer.states.tolist()) == [2, 3, 4]
+    states, actions, rewards, next_states = buffer.sample(10, np.random.default_rng(0))
+    assert set(states.tolist()) <= {2, 3, 4} and (next_states == states + 1).all()
+
+    for scheduler in ("replay", "prioritized"):
+        stats = TrainingStats(timed=False)
+        agent = Agent(feasibility, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=0, start_y=0)
+        epochs = agent.train(epochs=200, rng=3, scheduler=scheduler, observers=[stats])
+        assert agent.converged and epochs < 200 and len(stats.episode_steps) == epochs
+        assert agent.greedy_path_length() == maze.end_distance
+        assert stats.steps == agent.steps_trained
+
+        first, twin = (Agent(feasibility, gamma=0.8, lrn_rate=0.9, maze=maze, start_x=0, start_y=0)
+                       for _ in range(2))
+        first.train(epochs=2, tol=None, rng=3, scheduler=scheduler)
+        twin.train(epochs=2, tol=None, rng=3, scheduler=scheduler)
+        assert np.array_equal(first.Q, twin.Q)
+
+    try:
+        agent.train(epochs=10, scheduler="sarsa")
+        assert False, "Unknown schedulers should be rejected"
+    except ValueError:
+        pass
+
+    results = compare_schedulers(feasibility, maze, trials=2, epochs=200)
+    assert [result["scheduler"] for result in results] == list(SCHEDULERS)
+    for result in results:
+        assert result["success_rate"] == 1.0 and result["converged_rate"] == 1.0
+    episodes = {result["scheduler"]: result["episodes"] for result in results}
+    assert episodes["replay"] < episodes["uniform"] and episodes["prioritized"] < episodes["uniform"]
+    print(f"Episodes to convergence: {episodes}")
+
+def test_memmapped_planner():
+    """Test BFS on a memory-mapped maze only allocates the current BFS level"""
+    print("\nTesting memory-mapped planner...")
+    import tracemalloc
+    import numpy as np
+    size = 300
+    with tempfile.TemporaryDirectory() as directory:
+        stream_maze(os.path.join(directory, "large.maze"), size, size, rng=1)
+        maze = Maze.open(os.path.join(directory, "large.maze"))
+        feasibility = Feasibility(maze, dense=False, neighbors_file=os.path.join(directory, "neighbors.npy"))
+        tracemalloc.start()
+        planner = Planner(feasibility, gamma=0.8, maze=maze, start_x=0, start_y=0,
+                          distances_file=os.path.join(directory, "distances.npy"))
+        planner.shortest_path()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        # Q, R, the walk buffers and an in-memory distances array would each take >= 8 bytes per cell
+        assert peak < 2 * size * size, f"{peak / size ** 2:.1f} bytes per cell"
+        assert isinstance(planner.distances, np.memmap)
+        assert planner.path[-1] == planner.goal and planner.distances[planner.start] == len(planner.path) - 1
+
+        in_memory = Planner(feasibility, gamma=0.8, maze=maze, start_x=0, start_y=0)
+        in_memory.shortest_path()
+        assert in_memory.path == planner.path
+        assert np.array_equal(np.load(os.path.join(directory, "distances.npy")), in_memory.distances)
+        del maze, feasibility, planner, in_memory
+    print(f"BFS peak allocation: {peak / size ** 2:.2f} bytes per cell")
+
 if __name__ == "__main__":
     try:
         # Test all functionality
         maze = test_maze_creation()
+        test_maze_bitmask()
+        test_generators()
+        test_maze_files()
         feasibility = test_feasibility_matrix(maze)
+        test_sparse_feasibility()
         agent = test_agent_training(maze, feasibility)
+        test_batched_training()
+        test_planner()
+        test_early_stopping()
         test_visualization(maze, feasibility, agent)
+        test_rasterizer()
+        test_streaming_movie()
+        test_tiles()
+        test_batch_pipeline()
+        test_sweep()
+        test_seeding()
+        test_benchmark()
+        test_instrumentation()
+        test_persistence()
+        test_state_conversion()
+        test_vectorized_feasibility()
+        test_queries()
+        test_quiet_walk()
+        test_update_schedulers()
+        test_memmapped_planner()
         
         print("\n✅ All tests completed successfully!")
         
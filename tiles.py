@@ -0,0 +1,293 @@
+"""
+Tiled, level-of-detail maze rendering module.
+
+Mazes with millions of cells are far too large to render as a single image.
+This module renders them as a pyramid of fixed-size tiles stored on disk in a
+slippy-map layout (``<directory>/<level>/<x>/<y>.png``): the highest level shows
+the maze at full resolution and every level below halves the resolution, down
+to level 0 which fits in a single tile. Tiles are rendered lazily on demand or
+all at once with a process pool, reading only the part of the wall bitmask they
+cover, so memory-mapped mazes are never loaded as a whole. A solution path can
+be overlaid onto just the tiles it crosses.
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from draw import PathNotFound, rasterize_maze
+from maze import Maze
+
+# Renderer used by the worker processes of TileRenderer.render_all
+_worker_renderer = None
+
+
+class _MazeWindow:
+    """Rectangular part of a maze, in the form expected by ``rasterize_maze``."""
+
+    def __init__(self, walls):
+        self.walls = walls
+        self.nx, self.ny = walls.shape
+
+
+class TileRenderer:
+    """
+    Renders a maze as a pyramid of image tiles.
+
+    At the highest level (``max_level``) every cell is ``side`` pixels wide and
+    the maze is cut into ``tile_size`` x ``tile_size`` tiles; every lower level
+    is built by merging and halving four tiles of the level above.
+
+    Attributes:
+        maze (Maze): The maze to render.
+        directory (str): Root directory of the tile pyramid.
+        tile_size (int): Width and height of a tile in pixels.
+        side (int): Cell size in pixels at the highest level.
+        wide (int): Wall line width in pixels at the highest level.
+        width (int): Width of the full-resolution image in pixels.
+        height (int): Height of the full-resolution image in pixels.
+        max_level (int): Highest (full-resolution) zoom level.
+    """
+
+    def __init__(self, maze, directory, tile_size=256, side=16, wide=2):
+        """
+        Initialize the renderer.
+
+        Args:
+            maze (Maze): The maze to render.
+            directory (str): Root directory of the tile pyramid.
+            tile_size (int): Width and height of a tile in pixels (default: 256).
+            side (int): Cell size in pixels at full resolution (default: 16).
+            wide (int): Wall line width in pixels at full resolution (default: 2).
+        """
+        self.maze = maze
+        self.directory = directory
+        self.tile_size = tile_size
+        self.side = side
+        self.wide = wide
+        self.width = maze.nx * side + 2 * wide
+        self.height = maze.ny * side + 2 * wide
+        self.max_level = max(0, math.ceil(math.log2(max(self.width, self.height) / tile_size)))
+
+    def level_size(self, level):
+        """
+        Get the image size at a zoom level.
+
+        Args:
+            level (int): Zoom level.
+
+        Returns:
+            tuple: Width and height in pixels.
+        """
+        scale = 2 ** (self.max_level - level)
+        return math.ceil(self.width / scale), math.ceil(self.height / scale)
+
+    def tile_count(self, level):
+        """
+        Get the number of tile columns and rows at a zoom level.
+
+        Args:
+            level (int): Zoom level.
+
+        Returns:
+            tuple: Number of tile columns and rows.
+        """
+        width, height = self.level_size(level)
+        return math.ceil(width / self.tile_size), math.ceil(height / self.tile_size)
+
+    def tile_path(self, level, tx, ty, overlay=False):
+        """
+        Get the file path of a tile.
+
+        Args:
+            level (int): Zoom level.
+            tx (int): Tile column.
+            ty (int): Tile row.
+            overlay (bool): Whether to return the path of the path-overlay tile.
+
+        Returns:
+            str: Path of the tile image.
+        """
+        root = os.path.join(self.directory, "overlay") if overlay else self.directory
+        return os.path.join(root, str(level), str(tx), f"{ty}.png")
+
+    def get_tile(self, level, tx, ty, overlay=False):
+        """
+        Get a tile, rendering it (and the tiles it is built from) if needed.
+
+        Args:
+            level (int): Zoom level.
+            tx (int): Tile column.
+            ty (int): Tile row.
+            overlay (bool): Prefer the path-overlay version of the tile if one
+                was written by ``overlay_path`` (default: False).
+
+        Returns:
+            str: Path of the tile image.
+        """
+        if overlay and os.path.exists(self.tile_path(level, tx, ty, overlay=True)):
+            return self.tile_path(level, tx, ty, overlay=True)
+        filename = self.tile_path(level, tx, ty)
+        if not os.path.exists(filename):
+            self._save(self.render_tile(level, tx, ty), filename)
+        return filename
+
+    def render_tile(self, level, tx, ty):
+        """
+        Render a tile without caching it.
+
+        Tiles of the highest level are rasterized from the part of the wall
+        bitmask they cover; lower-level tiles are the four tiles above them
+        merged and halved.
+
+        Args:
+            level (int): Zoom level.
+            tx (int): Tile column.
+            ty (int): Tile row.
+
+        Returns:
+            Image: The RGB tile.
+        """
+        if level == self.max_level:
+            return Image.fromarray(self._rasterize_tile(tx, ty))
+
+        merged = Image.new("RGB", (2 * self.tile_size, 2 * self.tile_size), (255, 255, 255))
+        columns, rows = self.tile_count(level + 1)
+        for dx in range(2):
+            for dy in range(2):
+                child_x, child_y = 2 * tx + dx, 2 * ty + dy
+                if child_x < columns and child_y < rows:
+                    with Image.open(self.get_tile(level + 1, child_x, child_y)) as child:
+                        merged.paste(child, (dx * self.tile_size, dy * self.tile_size))
+        return merged.reduce(2)
+
+    def render_all(self, workers=None, chunksize=16):
+        """
+        Render every tile of the pyramid with a process pool.
+
+        The full-resolution level is rendered first, then every lower level from
+        the tiles of the level above. Tiles that already exist are kept.
+
+        Args:
+            workers (int): Number of worker processes (default: one per CPU).
+            chunksize (int): Number of tiles handed to a worker at a time (default: 16).
+
+        Returns:
+            int: Number of tiles in the pyramid.
+        """
+        n_tiles = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=self._worker_args()) as executor:
+            for level in range(self.max_level, -1, -1):
+                columns, rows = self.tile_count(level)
+                tasks = [(level, tx, ty) for tx in range(columns) for ty in range(rows)]
+                for _ in executor.map(_render_tile_task, tasks, chunksize=chunksize):
+                    pass
+                n_tiles += len(tasks)
+        return n_tiles
+
+    def overlay_path(self, path, color=(0, 0, 255), wide=None):
+        """
+        Draw a solution path onto the tiles it crosses, at every zoom level.
+
+        Overlay tiles are written next to the pyramid (see ``tile_path``) and the
+        plain tiles are left untouched; only tiles the path crosses are written.
+
+        Args:
+            path (list): Sequence of states (``x * ny + y``) visited by the agent.
+            color (tuple): RGB colour of the path (default: blue).
+            wide (int): Path line width at full resolution (default: a third of a cell).
+
+        Returns:
+            list: Paths of the overlay tiles written.
+
+        Raises:
+            PathNotFound: If the path did not reach the goal.
+        """
+        if 'break' in path:
+            raise PathNotFound
+        wide = max(1, self.side // 3) if wide is None else wide
+        states = np.asarray(path, dtype=np.int64)
+        centers = np.stack(divmod(states, self.maze.ny), axis=1) * self.side + self.wide + self.side / 2
+
+        written = []
+        for level in range(self.max_level, -1, -1):
+            scale = 2.0 ** (level - self.max_level)
+            points = centers * scale
+            width = max(1, round(wide * scale))
+            tiles = {}
+            for start, end in zip(points, points[1:] if len(points) > 1 else points):
+                low = np.minimum(start, end) - width
+                high = np.maximum(start, end) + width
+                for tx in range(int(low[0] // self.tile_size), int(high[0] // self.tile_size) + 1):
+                    for ty in range(int(low[1] // self.tile_size), int(high[1] // self.tile_size) + 1):
+                        tiles.setdefault((tx, ty), []).append((start, end))
+
+            columns, rows = self.tile_count(level)
+            for (tx, ty), segments in tiles.items():
+                if not (0 <= tx < columns and 0 <= ty < rows):
+                    continue
+                with Image.open(self.get_tile(level, tx, ty)) as base:
+                    tile = base.convert("RGB")
+                draw = ImageDraw.Draw(tile)
+                offset = np.array([tx, ty]) * self.tile_size
+                for start, end in segments:
+                    draw.line([tuple(start - offset), tuple(end - offset)], fill=color, width=width)
+                filename = self.tile_path(level, tx, ty, overlay=True)
+                self._save(tile, filename)
+                written.append(filename)
+        return written
+
+    def _rasterize_tile(self, tx, ty):
+        """Rasterize a full-resolution tile from the part of the maze it covers."""
+        size, side, wide = self.tile_size, self.side, self.wide
+        left, top = tx * size, ty * size
+
+        # Cells touching the tile, plus one on each side for the wall line ends
+        x0 = max(0, (left - 2 * wide) // side - 1)
+        y0 = max(0, (top - 2 * wide) // side - 1)
+        x1 = min(self.maze.nx, (left + size) // side + 2)
+        y1 = min(self.maze.ny, (top + size) // side + 2)
+        window = _MazeWindow(np.asarray(self.maze.walls[x0:x1, y0:y1]))
+
+        # Cell x of the window starts at pixel wide + x * side of the buffer
+        buffer = rasterize_maze(window, side, border=wide + side // 2, thickness=0, wide=wide, grid=False)
+        for x, y in (self.maze.start, self.maze.end):
+            if x0 <= x < x1 and y0 <= y < y1:
+                buffer[wide + (y - y0) * side + wide:wide + (y - y0 + 1) * side - wide,
+                       wide + (x - x0) * side + wide:wide + (x - x0 + 1) * side - wide] = (255, 0, 0)
+
+        tile = np.full((size, size, 3), 255, dtype=np.uint8)
+        shift_x, shift_y = left - x0 * side, top - y0 * side
+        part = buffer[shift_y:shift_y + size, shift_x:shift_x + size]
+        tile[:part.shape[0], :part.shape[1]] = part
+        return tile
+
+    def _save(self, image, filename):
+        """Write a tile image, creating its directory."""
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        image.save(filename)
+
+    def _worker_args(self):
+        """Arguments recreating this renderer in a worker process."""
+        source = self.maze.filename or self.maze
+        return source, self.directory, self.tile_size, self.side, self.wide
+
+
+def _init_worker(source, directory, tile_size, side, wide):
+    """Create the renderer of a worker process, reopening file-backed mazes."""
+    global _worker_renderer
+    maze = Maze.open(source) if isinstance(source, str) else source
+    _worker_renderer = TileRenderer(maze, directory, tile_size, side, wide)
+
+
+def _render_tile_task(task):
+    """Render one tile in a worker process unless it already exists."""
+    level, tx, ty = task
+    filename = _worker_renderer.tile_path(level, tx, ty)
+    if not os.path.exists(filename):
+        _worker_renderer._save(_worker_renderer.render_tile(level, tx, ty), filename)
+    return filename